@@ -0,0 +1,297 @@
+""" Headless benchmarks of the strategies and game engines.
+
+Run python benchmark.py to print the results as JSON, with -o to save them
+instead, and with --compare to check them against a saved baseline: the
+regressions in states visited and memory are listed, and the exit status is
+1 if there are any. Slower timings are listed too, but timings vary too
+much from run to run to fail on.
+"""
+from subtract_square_state import SubtractSquareState
+from subtract_square_move import SubtractSquareMove
+from tippy_game_state import TippyGameState, is_tippy
+from strategy_random import StrategyRandom
+from strategy_minimax import StrategyMiniMax
+from strategy_minimax_memoize import StrategyMiniMaxMemoize
+from strategy_minimax_prune import StrategyMiniMaxPrune
+from random import Random
+from time import perf_counter
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+
+STRATEGIES = (StrategyMiniMax, StrategyMiniMaxMemoize, StrategyMiniMaxPrune,
+              StrategyRandom)
+
+# Totals of the Subtract Square corpus, and sidelengths and piece counts of
+# the Tippy corpus.
+SUBTRACT_SQUARE_TOTALS = (5, 10, 15, 20, 25)
+TIPPY_POSITIONS = ((3, 1), (3, 2), (3, 3), (3, 4), (3, 5), (4, 8), (4, 9),
+                   (4, 10))
+
+# Percentiles of latency reported for each strategy and corpus.
+PERCENTILES = (50, 90, 99)
+
+# Latencies below this many milliseconds are mostly timer and scheduler
+# noise, and are not compared. The engine timings are the best of runs of
+# at least 0.2 seconds each, so they are always compared.
+NOISE_FLOOR_MS = 1.0
+
+# Measurements, by parts of their dotted paths, that do not change from
+# run to run, which are regressions if they go up, and the timings
+# reported if they go up.
+COMPARED = ('nodes', 'peak_memory_bytes')
+TIMED = ('latency_ms.best', 'latency_ms.p50', 'micro_ns')
+
+
+def subtract_square_corpus():
+    """ () -> list of SubtractSquareState
+
+    Return the Subtract Square positions the strategies are benchmarked on.
+    """
+
+    return [SubtractSquareState('p1', current_total=total)
+            for total in SUBTRACT_SQUARE_TOTALS]
+
+
+def tippy_corpus():
+    """ () -> list of TippyGameState
+
+    Return the Tippy positions the strategies are benchmarked on: the same
+    random positions on every run, none of them over.
+
+    >>> [len(tippy_corpus()), tippy_corpus() == tippy_corpus()]
+    [8, True]
+    """
+
+    rng = Random(2016)
+    states = []
+    for n, pieces in TIPPY_POSITIONS:
+        state = None
+        while state is None or state.over:
+            state = TippyGameState('p1', n)
+            for move in rng.sample(state.possible_next_moves(), pieces):
+                state = state.apply_move(move)
+                if state.over:
+                    break
+        states.append(state)
+    return states
+
+
+def percentile(values, percent):
+    """ (list of float, float) -> float
+
+    Return the given percentile of values, interpolating linearly between
+    the two nearest values.
+
+    >>> percentile([4, 1, 3, 2], 50)
+    2.5
+    >>> percentile([4, 1, 3, 2], 100)
+    4
+    """
+
+    values = sorted(values)
+    position = (len(values) - 1) * percent / 100
+    low = int(position)
+    if low + 1 == len(values):
+        return values[low]
+    return values[low] + (values[low + 1] - values[low]) * (position - low)
+
+
+def benchmark_strategy(strategy_class, states, repeat):
+    """ (Strategy.__class__, list of GameState, int) -> dict
+
+    Return the latencies of suggest_move over states, each timed repeat
+    times with a fresh strategy, along with the mean over states of the
+    fastest time, the states visited by one call on each state and per
+    second where the strategy counts them, and the peak memory allocated by
+    one call.
+    """
+
+    latencies, nodes, seconds = [], 0, 0.0
+    fastest = [float('inf')] * len(states)
+    for _ in range(repeat):
+        for i, state in enumerate(states):
+            strategy = strategy_class()
+            start = perf_counter()
+            strategy.suggest_move(state)
+            elapsed = perf_counter() - start
+            latencies.append(elapsed)
+            fastest[i] = min(fastest[i], elapsed)
+            if hasattr(strategy, 'nodes'):
+                nodes += strategy.nodes
+                seconds += elapsed
+    # Memory is traced in a separate pass, which tracing slows down.
+    peak = 0
+    tracemalloc.start()
+    try:
+        for state in states:
+            strategy = strategy_class()
+            tracemalloc.reset_peak()
+            strategy.suggest_move(state)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    result = {'calls': len(latencies),
+              'latency_ms': {'mean': 1000 * sum(latencies) / len(latencies),
+                             'max': 1000 * max(latencies),
+                             'best': 1000 * sum(fastest) / len(fastest)},
+              'nodes': nodes // repeat if seconds else None,
+              'nodes_per_second': nodes / seconds if seconds else None,
+              'peak_memory_bytes': peak}
+    for percent in PERCENTILES:
+        result['latency_ms']['p{}'.format(percent)] = (
+            1000 * percentile(latencies, percent))
+    return result
+
+
+def micro_benchmarks(repeat):
+    """ (int) -> dict of {str: float}
+
+    Return the best time in nanoseconds per call, out of repeat runs, of
+    the engine methods the strategies spend their time in.
+    """
+
+    tippy = tippy_corpus()[-1]
+    tippy_move = tippy.possible_next_moves()[0]
+    grid = tippy.grid
+    subtract = SubtractSquareState('p1', current_total=10001)
+    subtract_move = SubtractSquareMove(9801)
+    cases = {
+        'tippy.apply_move': lambda: tippy.apply_move(tippy_move),
+        'tippy.possible_next_moves': tippy.possible_next_moves,
+        'tippy.rough_outcome': tippy.rough_outcome,
+        'tippy.is_tippy': lambda: is_tippy(grid, -1),
+        'subtract_square.apply_move':
+            lambda: subtract.apply_move(subtract_move),
+        'subtract_square.possible_next_moves': subtract.possible_next_moves,
+        'subtract_square.rough_outcome': subtract.rough_outcome}
+    results = {}
+    for name, case in cases.items():
+        timer = timeit.Timer(case)
+        number = timer.autorange()[0]
+        best = min(timer.repeat(repeat, number))
+        results[name] = 1e9 * best / number
+    return results
+
+
+def run(strategy_classes, repeat):
+    """ (list of Strategy.__class__, int) -> dict
+
+    Return the results of every benchmark, ready to be saved as JSON.
+    """
+
+    corpora = {'subtract_square': subtract_square_corpus(),
+               'tippy': tippy_corpus()}
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'strategies': {strategy_class.__name__:
+                               {name: benchmark_strategy(strategy_class,
+                                                         states, repeat)
+                                for name, states in corpora.items()}
+                           for strategy_class in strategy_classes},
+            'micro_ns': micro_benchmarks(repeat)}
+
+
+def flatten(results, prefix=''):
+    """ (dict, str) -> dict of {str: float}
+
+    Return the numbers in results, keyed by their dotted paths.
+
+    >>> flatten({'a': {'b': 1, 'c': None}, 'd': 'x'})
+    {'a.b': 1}
+    """
+
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(baseline, results, threshold, measurements=COMPARED):
+    """ (dict, dict, float, tuple of str) -> list of str
+
+    Return a description of each of the measurements (by a run of whole
+    parts of their dotted paths) that is higher in results than in
+    baseline by more than threshold, a fraction. Latencies below
+    NOISE_FLOOR_MS in both are left out.
+
+    >>> compare({'s': {'nodes': 100, 'latency_ms': {'best': 2.0}}},
+    ...         {'s': {'nodes': 150, 'latency_ms': {'best': 3.0}}}, 0.25)
+    ['s.nodes: 100 -> 150 (+50%)']
+    >>> compare({'s': {'latency_ms': {'best': 2.0}}},
+    ...         {'s': {'latency_ms': {'best': 3.0}}}, 0.25, TIMED)
+    ['s.latency_ms.best: 2 -> 3 (+50%)']
+    >>> compare({'s': {'latency_ms': {'best': 0.01}}},
+    ...         {'s': {'latency_ms': {'best': 0.03}}}, 0.25, TIMED)
+    []
+    >>> compare({'micro_ns': {'tippy.apply_move': 2500.0}},
+    ...         {'micro_ns': {'tippy.apply_move': 5000.0}}, 0.25, TIMED)
+    ['micro_ns.tippy.apply_move: 2500 -> 5000 (+100%)']
+    """
+
+    old, new = flatten(baseline), flatten(results)
+    regressions = []
+    for key in sorted(old.keys() & new.keys()):
+        if old[key] == 0 or not any('.{}.'.format(name) in
+                                    '.{}.'.format(key)
+                                    for name in measurements):
+            continue
+        if ('latency_ms' in key and
+                max(old[key], new[key]) < NOISE_FLOOR_MS):
+            continue
+        change = (new[key] - old[key]) / old[key]
+        if change > threshold:
+            regressions.append('{}: {:.4g} -> {:.4g} ({:+.0%})'.format(
+                key, old[key], new[key], (new[key] - old[key]) / old[key]))
+    return regressions
+
+
+def main(args):
+    """ (list of str) -> int
+
+    Run the benchmarks as told by the command-line arguments args, and
+    return the exit status.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--output', help='file to save results to')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='saved results to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fraction by which a measurement may worsen')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='times each measurement is repeated')
+    parser.add_argument('--strategy', action='append',
+                        choices=[s.__name__ for s in STRATEGIES],
+                        help='strategy to benchmark (default: all)')
+    options = parser.parse_args(args)
+    strategy_classes = [s for s in STRATEGIES
+                        if not options.strategy or
+                        s.__name__ in options.strategy]
+    results = run(strategy_classes, options.repeat)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        for slower in compare(baseline, results, options.threshold, TIMED):
+            print('Slower: ' + slower, file=sys.stderr)
+        regressions = compare(baseline, results, options.threshold)
+        for regression in regressions:
+            print('Regression: ' + regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,295 @@
+from collections import OrderedDict
+from hashlib import blake2b
+import atexit
+import os
+import pickle
+import sqlite3
+
+# Stores written to the database together, in one transaction.
+BATCH_SIZE = 1024
+
+SCHEMA = '''CREATE TABLE IF NOT EXISTS entries (
+    key INTEGER PRIMARY KEY,
+    score NOT NULL,
+    move BLOB,
+    flag INTEGER,
+    depth INTEGER)'''
+
+# An entry replaces a stored one unless the stored one was searched deeper.
+UPSERT = '''INSERT INTO entries VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (key) DO UPDATE SET score = excluded.score,
+        move = excluded.move, flag = excluded.flag, depth = excluded.depth
+    WHERE entries.depth IS NULL OR excluded.depth IS NULL OR
+        excluded.depth >= entries.depth'''
+
+
+class DiskTranspositionTable:
+    ''' A table of search results kept in an SQLite database, so that they
+    outlive the process, and shared by every process that opens the same
+    file. It is used like a TranspositionTable.
+
+    Entries are tuples of a score, a move (None, or any picklable move),
+    and optionally a flag and a search depth, as the strategies store them:
+    strategies sharing a file should store the same kind of entry. The most
+    recently used entries are cached in the process, and new entries are
+    written in batches: call flush, or close, to write the rest. The table
+    is closed when the process exits normally.
+
+    path: str          -- path of the database
+    cache_entries: int -- most entries cached in the process
+    hits: int          -- number of calls to get that found their key
+    misses: int        -- number of calls to get that did not
+    stores: int        -- number of entries stored
+    evictions: int     -- number of entries evicted from the cache
+    '''
+
+    def __init__(self, path, cache_entries=2 ** 16):
+        '''(DiskTranspositionTable, str, int) -> NoneType
+
+        Open the table in the database at path, creating it if there is
+        none, with a cache of at most cache_entries entries.
+
+        >>> import os, subprocess, sys, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'table.db')
+        >>> code = ('from disk_table import DiskTranspositionTable\\n'
+        ...         'DiskTranspositionTable({!r})[17] = (1, None)'.format(path))
+        >>> subprocess.run([sys.executable, '-c', code], check=True,
+        ...     cwd=os.path.dirname(os.path.abspath(__file__))).returncode
+        0
+        >>> DiskTranspositionTable(path).get(17)
+        (1, None)
+        '''
+        self.path, self.cache_entries = path, cache_entries
+        self.hits, self.misses, self.stores, self.evictions = 0, 0, 0, 0
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._connection, self._pid = None, None
+
+    def __repr__(self):
+        '''(DiskTranspositionTable) -> str
+
+        Return a string representation of this DiskTranspositionTable.
+
+        >>> DiskTranspositionTable('table.db')
+        DiskTranspositionTable('table.db', 65536)
+        '''
+        return 'DiskTranspositionTable({}, {})'.format(
+            repr(self.path), repr(self.cache_entries))
+
+    def __reduce__(self):
+        '''(DiskTranspositionTable) -> tuple
+
+        Return how to pickle this DiskTranspositionTable: by its path and
+        cache size, so that another process opens the same database.
+        '''
+        return (DiskTranspositionTable, (self.path, self.cache_entries))
+
+    def connection(self):
+        '''(DiskTranspositionTable) -> sqlite3.Connection
+
+        Return this process's connection to the database, opening it in
+        write-ahead logging mode, which lets readers and a writer in other
+        processes work at once.
+        '''
+        if self._connection is None or self._pid != os.getpid():
+            # A connection inherited from a parent process is not used.
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute('PRAGMA journal_mode = WAL')
+            self._connection.execute('PRAGMA synchronous = NORMAL')
+            self._connection.execute(SCHEMA)
+            self._connection.commit()
+            self._pid = os.getpid()
+        return self._connection
+
+    def __len__(self):
+        '''(DiskTranspositionTable) -> int
+
+        Return the number of entries in the database, after writing the
+        pending ones.
+        '''
+        self.flush()
+        return self.connection().execute(
+            'SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def __contains__(self, key):
+        '''(DiskTranspositionTable, object) -> bool
+
+        Return whether key has an entry. Does not count as a use of it.
+        '''
+        return (key in self._cache or key in self._pending or
+                self.load(key) is not None)
+
+    def __getitem__(self, key):
+        '''(DiskTranspositionTable, object) -> tuple
+
+        Return the entry for key. Raise KeyError if there is none.
+        '''
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        '''(DiskTranspositionTable, object, object) -> tuple
+
+        Return the entry for key, or default if there is none. Counts a hit
+        or a miss.
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'table.db')
+        >>> table = DiskTranspositionTable(path)
+        >>> table[(17, 'p1')] = (1, None)
+        >>> table.close()
+        >>> table = DiskTranspositionTable(path)
+        >>> table.get((17, 'p1')), table.get((16, 'p1'))
+        ((1, None), None)
+        >>> table.hits, table.misses
+        (1, 1)
+        '''
+        value = self._cache.get(key)
+        if value is not None:
+            self._cache.move_to_end(key)
+        else:
+            value = self._pending.get(key)
+            if value is None:
+                value = self.load(key)
+                if value is None:
+                    self.misses += 1
+                    return default
+            self.cache(key, value)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        '''(DiskTranspositionTable, object, tuple) -> NoneType
+
+        Store value as the entry for key, writing it to the database with
+        the next batch.
+        '''
+        self.stores += 1
+        self.cache(key, value)
+        if not self._pending:
+            # Write the pending entries even if the table is never closed.
+            # Only a table with pending entries is kept alive for this.
+            atexit.register(self.close)
+        self._pending[key] = value
+        if len(self._pending) >= BATCH_SIZE:
+            self.flush()
+
+    def cache(self, key, value):
+        '''(DiskTranspositionTable, object, tuple) -> NoneType
+
+        Cache value as the entry for key, evicting the least recently used
+        entries beyond cache_entries.
+        '''
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def load(self, key):
+        '''(DiskTranspositionTable, object) -> tuple
+
+        Return the entry for key in the database, or None if there is none.
+        '''
+        row = self.connection().execute(
+            'SELECT score, move, flag, depth FROM entries WHERE key = ?',
+            (row_key(key),)).fetchone()
+        if row is None:
+            return None
+        score, move, flag, depth = row
+        value = (score, None if move is None else pickle.loads(move),
+                 flag, depth)
+        # Leave out the fields the entry was stored without.
+        while len(value) > 2 and value[-1] is None:
+            value = value[:-1]
+        return value
+
+    def flush(self):
+        '''(DiskTranspositionTable) -> NoneType
+
+        Write the pending entries to the database.
+        '''
+        if not self._pending:
+            return
+        rows = []
+        for key, value in self._pending.items():
+            value = tuple(value) + (None,) * (4 - len(value))
+            move = None if value[1] is None else pickle.dumps(value[1])
+            rows.append((row_key(key), value[0], move, value[2], value[3]))
+        connection = self.connection()
+        with connection:
+            connection.executemany(UPSERT, rows)
+        self._pending.clear()
+        atexit.unregister(self.close)
+
+    def clear(self):
+        '''(DiskTranspositionTable) -> NoneType
+
+        Remove every entry from this DiskTranspositionTable and its
+        database. The counters are kept.
+        '''
+        self._cache.clear()
+        self._pending.clear()
+        atexit.unregister(self.close)
+        connection = self.connection()
+        with connection:
+            connection.execute('DELETE FROM entries')
+
+    def close(self):
+        '''(DiskTranspositionTable) -> NoneType
+
+        Write the pending entries and close the database. The table opens
+        it again when it is next used.
+
+        >>> import gc, os, tempfile, weakref
+        >>> table = DiskTranspositionTable(
+        ...     os.path.join(tempfile.mkdtemp(), 'table.db'))
+        >>> table[17] = (1, None)
+        >>> table.close()
+        >>> alive = weakref.ref(table)
+        >>> del table
+        >>> _ = gc.collect()
+        >>> alive() is None
+        True
+        '''
+        self.flush()
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+
+def stable_key(key):
+    '''(object) -> int
+
+    Return an unsigned 64-bit int for key that is the same in every
+    process: key itself if it is such an int, as Tippy's Zobrist keys are,
+    and a hash of its repr otherwise.
+
+    >>> stable_key(17)
+    17
+    >>> stable_key((17, 'p1')) == stable_key((17, 'p1')) != stable_key(17)
+    True
+    '''
+    if isinstance(key, int) and 0 <= key < 2 ** 64:
+        return key
+    return int.from_bytes(blake2b(repr(key).encode(), digest_size=8).digest(),
+                          'little')
+
+
+def row_key(key):
+    '''(object) -> int
+
+    Return the stable_key of key as a signed 64-bit int, for SQLite.
+
+    >>> row_key(2 ** 64 - 1)
+    -1
+    '''
+    key = stable_key(key)
+    return key - 2 ** 64 if key >= 2 ** 63 else key
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,103 @@
+""" A client playing many games at once against a game_server, with random
+moves.
+
+For example, to play 200 simultaneous games of Tippy on a 4x4 board
+against alpha-beta search, on a server started with
+python game_server.py --port 8765:
+
+    python game_client.py --port 8765 --games 200 --game tippy \\
+        --params '{"n": 4}' --strategy StrategyMiniMaxPrune
+"""
+from functools import partial
+from time import perf_counter
+import argparse
+import asyncio
+import json
+import random
+import sys
+
+
+async def play_session(connect, request):
+    '''(function, dict) -> str
+
+    Open a connection with connect, play the game described by request
+    with random moves, and return its result: you, computer or tie as sent
+    by the server, or error.
+    '''
+    reader, writer = await connect()
+    try:
+        writer.write('NEW {}\n'.format(json.dumps(request)).encode())
+        await writer.drain()
+        while True:
+            line = (await reader.readline()).decode()
+            if not line:
+                return 'error'
+            command, _, text = line.strip().partition(' ')
+            if command == 'STATE':
+                move = random.choice(json.loads(text)['moves'])
+                writer.write('MOVE {}\n'.format(move).encode())
+                await writer.drain()
+            elif command == 'OVER':
+                return text
+            elif command in ('ERROR', 'ILLEGAL'):
+                return 'error'
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def play_sessions(connect, request, games):
+    '''(function, dict, int) -> dict of {str: int}
+
+    Play games sessions of request at once, and return the number of each
+    result.
+    '''
+    totals = {'you': 0, 'computer': 0, 'tie': 0, 'error': 0}
+    results = await asyncio.gather(
+        *[play_session(connect, request) for _ in range(games)],
+        return_exceptions=True)
+    for result in results:
+        totals[result if result in totals else 'error'] += 1
+    return totals
+
+
+def main(args):
+    '''(list of str) -> int
+
+    Play the sessions described by the command-line arguments args, print
+    their totals, and return the exit status: 1 if any session failed.
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH',
+                        help='connect to a Unix socket instead of TCP')
+    parser.add_argument('--game', default='subtract_square')
+    parser.add_argument('--params', type=json.loads,
+                        default={'current_total': 20},
+                        help='JSON keyword arguments for the game state')
+    parser.add_argument('--strategy', default='StrategyMiniMaxPrune')
+    parser.add_argument('--strategy-args', type=json.loads, default={},
+                        help="JSON keyword arguments for the strategy")
+    parser.add_argument('--computer-first', action='store_true')
+    parser.add_argument('--games', type=int, default=100)
+    options = parser.parse_args(args)
+    if options.unix:
+        connect = partial(asyncio.open_unix_connection, options.unix)
+    else:
+        connect = partial(asyncio.open_connection, options.host, options.port)
+    request = {'game': options.game, 'params': options.params,
+               'strategy': options.strategy,
+               'strategy_args': options.strategy_args,
+               'computer_first': options.computer_first}
+    start = perf_counter()
+    totals = asyncio.run(play_sessions(connect, request, options.games))
+    print('you won {you}, computer won {computer}, {tie} ties, {error} '
+          'errors'.format(**totals), 'in {:.1f}s'.format(perf_counter() -
+                                                         start),
+          file=sys.stderr)
+    return 1 if totals['error'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
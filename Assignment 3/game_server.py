@@ -0,0 +1,410 @@
+""" A server hosting many games against the strategies at once.
+
+Each connection to the server is one game, played by exchanging lines of
+text. The client opens the game with a line of JSON naming the game, its
+parameters and the computer's strategy:
+
+    NEW {"game": "tippy", "params": {"n": 4},
+         "strategy": "StrategyMiniMaxPrune", "strategy_args": {},
+         "computer_first": false}
+
+and the server answers OK and the number of the session. The parameters
+each game and strategy accepts are listed in GAME_PARAMS and
+STRATEGY_ARGS. The client plays
+'p1' and the computer 'p2'. Until the game is over, the server sends
+
+    STATE {"board": ..., "next_player": ..., "moves": [...]}
+
+when it is the client's turn, and the client answers MOVE and the repr of
+one of the moves listed (or QUIT). The server answers an illegal move with
+ILLEGAL, and sends PLAYED and its move after each move of the computer.
+At the end it sends OVER and the winner: you, computer or tie. Anything it
+cannot follow is answered with ERROR and a reason.
+
+The strategies search in a pool of worker processes shared by every
+session, so a slow search only holds up its own game, and a session that
+runs past its deadline is closed. A search may only take the time left in
+its session, so that it does not hold up a worker for other sessions after
+its own is closed. For example:
+
+    python game_server.py --port 8765 --workers 4 --deadline 600
+"""
+from self_play import GAMES, STRATEGIES
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import signal
+import sys
+import time
+
+# Connections waiting to be accepted before more are refused.
+BACKLOG = 1024
+
+# The parameters a client may give each game, and each strategy, with
+# their type and least and greatest values. Parameters that prompt for
+# input, name files or take objects are left out. The game parameters are
+# required; the strategy parameters have defaults.
+GAME_PARAMS = {
+    'subtract_square': {'current_total': (int, 1, 10 ** 6)},
+    'tippy': {'n': (int, 3, 8)}}
+TABLE_ARGS = {'max_entries': (int, 1, 2 ** 20),
+              'max_bytes': (int, 1, 2 ** 28)}
+TIME_ARGS = {'time_limit': (float, 0.01, 60.0)}
+STRATEGY_ARGS = {
+    'StrategyRandom': {}, 'StrategyMiniMax': {},
+    'StrategyMiniMaxMemoize': TABLE_ARGS,
+    'StrategyMiniMaxPrune': TABLE_ARGS,
+    'StrategyIterativeDeepening': dict(
+        TIME_ARGS, node_limit=(int, 1, 10 ** 7),
+        max_entries=(int, 1, 2 ** 20)),
+    'StrategySubtractSquareTable': {}, 'StrategyTablebase': {},
+    'StrategyMCTS': dict(TIME_ARGS, iterations=(int, 1, 10 ** 6),
+                         exploration=(float, 0.0, 10.0)),
+    'StrategyProofNumber': dict(TIME_ARGS, node_limit=(int, 1, 10 ** 7),
+                                max_entries=(int, 1, 2 ** 21)),
+    'StrategyOpeningBook': {}}
+
+# The strategies of a worker process, by name and arguments, kept across
+# the moves it is asked for so that their tables are reused. The oldest are
+# dropped beyond WORKER_STRATEGIES.
+worker_strategies = {}
+WORKER_STRATEGIES = 16
+
+
+def suggest_move(strategy, strategy_args, state, deadline=None):
+    '''(str, dict, GameState, float) -> Move
+
+    Return the move suggested for state by the strategy named strategy in
+    STRATEGIES, created with strategy_args, in a worker process. The search
+    must end by deadline, a time.time(), or None for no limit: a strategy
+    with a time_limit is given at most the time left, counted when the
+    search starts, and any other search still running at deadline is
+    stopped with DeadlineExceeded.
+
+    >>> from subtract_square_state import SubtractSquareState
+    >>> suggest_move('StrategyMiniMaxPrune', {},
+    ...              SubtractSquareState('p1', current_total=8),
+    ...              time.time() + 10)
+    SubtractSquareMove(1)
+    >>> suggest_move('StrategyMiniMax', {},
+    ...              SubtractSquareState('p1', current_total=70),
+    ...              time.time() + 0.1)
+    ... # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    DeadlineExceeded: search ran past the session deadline
+    '''
+    key = (strategy, json.dumps(strategy_args, sort_keys=True))
+    if key not in worker_strategies:
+        if len(worker_strategies) >= WORKER_STRATEGIES:
+            del worker_strategies[next(iter(worker_strategies))]
+        worker_strategies[key] = STRATEGIES[strategy](**strategy_args)
+    strategy = worker_strategies[key]
+    if deadline is None:
+        return strategy.suggest_move(state)
+    # The time spent waiting for a worker is not the search's to use.
+    time_left = deadline - time.time()
+    time_limit = getattr(strategy, 'time_limit', None)
+    if hasattr(strategy, 'time_limit'):
+        strategy.time_limit = (time_left if time_limit is None else
+                               min(time_limit, time_left))
+    handler = signal.signal(signal.SIGALRM, stop_search)
+    signal.setitimer(signal.ITIMER_REAL, max(time_left, 0.001))
+    try:
+        return strategy.suggest_move(state)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, handler)
+        if hasattr(strategy, 'time_limit'):
+            strategy.time_limit = time_limit
+
+
+def stop_search(signum, frame):
+    '''(int, frame) -> NoneType
+
+    Stop the search running in a worker process, when its time is up.
+    '''
+    raise DeadlineExceeded('search ran past the session deadline')
+
+
+def parse_request(line):
+    '''(str) -> dict
+
+    Return the request of a NEW line, with its defaults filled in. Raise
+    ValueError if it is not a valid request: the game's params and the
+    strategy's strategy_args must be as allowed by GAME_PARAMS and
+    STRATEGY_ARGS.
+
+    >>> request = parse_request('NEW {"game": "subtract_square", '
+    ...     '"params": {"current_total": 20}, "strategy": "StrategyRandom"}')
+    >>> request['strategy_args'], request['computer_first']
+    ({}, False)
+    >>> parse_request('NEW {"game": "chess", "strategy": "StrategyRandom"}')
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown game: chess
+    >>> parse_request('NEW {"game": "tippy", "params": {"n": 4, '
+    ...     '"interactive": true}, "strategy": "StrategyRandom"}')
+    Traceback (most recent call last):
+    ...
+    ValueError: params: unexpected interactive
+    >>> parse_request('NEW {"game": "tippy", "params": {"n": 1000}, '
+    ...     '"strategy": "StrategyRandom"}')
+    Traceback (most recent call last):
+    ...
+    ValueError: params: n must be from 3 to 8
+    >>> parse_request('NEW {"game": "tippy", "params": {"n": 4}, '
+    ...     '"strategy": "StrategyMCTS", "strategy_args": '
+    ...     '{"time_limit": "soon"}}')
+    Traceback (most recent call last):
+    ...
+    ValueError: strategy_args: time_limit must be a number
+    '''
+    command, _, text = line.strip().partition(' ')
+    if command != 'NEW':
+        raise ValueError('expected NEW')
+    request = json.loads(text)
+    if not isinstance(request, dict):
+        raise ValueError('expected a JSON object')
+    request.setdefault('params', {})
+    request.setdefault('strategy_args', {})
+    request.setdefault('computer_first', False)
+    if request.get('game') not in GAMES:
+        raise ValueError('unknown game: {}'.format(request.get('game')))
+    if request.get('strategy') not in STRATEGIES:
+        raise ValueError('unknown strategy: {}'.format(
+            request.get('strategy')))
+    if not isinstance(request['computer_first'], bool):
+        raise ValueError('computer_first must be true or false')
+    check_args('params', request['params'], GAME_PARAMS[request['game']],
+               True)
+    check_args('strategy_args', request['strategy_args'],
+               STRATEGY_ARGS[request['strategy']], False)
+    return request
+
+
+def check_args(name, args, allowed, required):
+    '''(str, object, dict of {str: tuple of (type, number, number)}, bool)
+           -> NoneType
+
+    Raise ValueError, naming args as name, unless args is a dict of
+    keyword arguments each allowed, of the type and within the range given
+    for it in allowed. If required, every argument in allowed must be
+    given.
+
+    >>> check_args('args', {'n': 3.5}, {'n': (int, 3, 8)}, True)
+    Traceback (most recent call last):
+    ...
+    ValueError: args: n must be an int
+    '''
+    if not isinstance(args, dict):
+        raise ValueError('{} must be a JSON object'.format(name))
+    for key, value in args.items():
+        if key not in allowed:
+            raise ValueError('{}: unexpected {}'.format(name, key))
+        kind, low, high = allowed[key]
+        # JSON numbers may be ints where floats are allowed, never bools.
+        kinds = (int, float) if kind is float else (int,)
+        if isinstance(value, bool) or not isinstance(value, kinds):
+            raise ValueError('{}: {} must be {}'.format(
+                name, key, 'a number' if kind is float else 'an int'))
+        if not low <= value <= high:
+            raise ValueError('{}: {} must be from {} to {}'.format(
+                name, key, low, high))
+    if required:
+        for key in allowed:
+            if key not in args:
+                raise ValueError('{}: missing {}'.format(name, key))
+
+
+def state_message(state):
+    '''(GameState) -> str
+
+    Return the STATE line describing state to the client.
+
+    >>> from subtract_square_state import SubtractSquareState
+    >>> print(state_message(SubtractSquareState('p1', current_total=5)))
+    STATE {"board": "Current total: 5; next player: p1", "next_player": "p1", "moves": ["SubtractSquareMove(4)", "SubtractSquareMove(1)"]}
+    '''
+    return 'STATE ' + json.dumps({
+        'board': str(state), 'next_player': state.next_player,
+        'moves': [repr(move) for move in state.possible_next_moves()]})
+
+
+class GameServer:
+    ''' Game sessions served over asyncio streams, with one shared pool of
+    worker processes for the strategies' searches.
+
+    deadline: float  -- seconds a session may last
+    sessions: int    -- number of sessions open now
+    '''
+
+    def __init__(self, workers=None, deadline=600.0):
+        '''(GameServer, int, float) -> NoneType
+
+        Create a GameServer whose searches run in workers processes (one per
+        CPU if None), and whose sessions last at most deadline seconds.
+        '''
+        self.deadline = deadline
+        self.sessions = 0
+        # Workers are started by a fork server, so that they do not inherit
+        # the connections open when they start, which would keep them open
+        # after the server closes them.
+        self._pool = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context('forkserver'))
+        self._ids = itertools.count(1)
+
+    def close(self):
+        '''(GameServer) -> NoneType
+
+        Shut down the worker processes.
+        '''
+        self._pool.shutdown(cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        '''(GameServer, StreamReader, StreamWriter) -> NoneType
+
+        Serve one session on a connection, then close it.
+        '''
+        self.sessions += 1
+        try:
+            try:
+                await asyncio.wait_for(self.play(reader, writer),
+                                       self.deadline)
+            except asyncio.TimeoutError:
+                await send(writer, 'ERROR deadline exceeded')
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def play(self, reader, writer):
+        '''(GameServer, StreamReader, StreamWriter) -> NoneType
+
+        Play the game the client asks for over reader and writer.
+        '''
+        try:
+            request = parse_request((await reader.readline()).decode())
+            state = GAMES[request['game']](
+                'p2' if request['computer_first'] else 'p1',
+                **request['params'])
+        except Exception as error:
+            await send(writer, 'ERROR {}'.format(
+                error or type(error).__name__))
+            return
+        await send(writer, 'OK {}'.format(next(self._ids)))
+        loop = asyncio.get_running_loop()
+        deadline = time.time() + self.deadline
+        while not state.over:
+            if state.next_player == 'p2':
+                try:
+                    move = await loop.run_in_executor(
+                        self._pool, suggest_move, request['strategy'],
+                        request['strategy_args'], state, deadline)
+                except Exception as error:
+                    await send(writer, 'ERROR strategy failed: {}'.format(
+                        error or type(error).__name__))
+                    return
+                if not state.is_legal(move):
+                    await send(writer, 'ERROR strategy suggested an illegal '
+                               'move: {!r}'.format(move))
+                    return
+                state = state.apply_move(move)
+                await send(writer, 'PLAYED {!r}'.format(move))
+                continue
+            await send(writer, state_message(state))
+            line = await reader.readline()
+            if not line:
+                return
+            command, _, text = line.decode().strip().partition(' ')
+            if command == 'QUIT':
+                return
+            if command != 'MOVE':
+                await send(writer, 'ERROR expected MOVE or QUIT')
+                continue
+            moves = {repr(move): move for move in state.possible_next_moves()}
+            if text not in moves:
+                await send(writer, 'ILLEGAL {}'.format(text))
+                continue
+            state = state.apply_move(moves[text])
+        if state.winner('p1'):
+            await send(writer, 'OVER you')
+        elif state.winner('p2'):
+            await send(writer, 'OVER computer')
+        else:
+            await send(writer, 'OVER tie')
+
+
+async def send(writer, line):
+    '''(StreamWriter, str) -> NoneType
+
+    Send line to the client of writer.
+    '''
+    writer.write(line.encode() + b'\n')
+    await writer.drain()
+
+
+async def serve(server, host, port, path):
+    '''(GameServer, str, int, str) -> NoneType
+
+    Serve sessions of server on the Unix socket at path, or on host and
+    port if path is None, until cancelled.
+    '''
+    # Clients may open hundreds of sessions at once.
+    if path is not None:
+        listener = await asyncio.start_unix_server(server.handle, path,
+                                                   backlog=BACKLOG)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port,
+                                              backlog=BACKLOG)
+    print('Serving on {}'.format(path or '{}:{}'.format(host, port)),
+          file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(args):
+    '''(list of str) -> NoneType
+
+    Run the server as told by the command-line arguments args.
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH',
+                        help='serve on a Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='search processes (default: one per CPU)')
+    parser.add_argument('--deadline', type=float, default=600.0,
+                        help='seconds a session may last')
+    options = parser.parse_args(args)
+    server = GameServer(options.workers, options.deadline)
+    try:
+        asyncio.run(serve(server, options.host, options.port, options.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+class DeadlineExceeded(Exception):
+    '''
+    Raised in a worker process when a search runs past the deadline of its
+    session.
+    '''
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(sys.argv[1:])
+    else:
+        import doctest
+        doctest.testmod()
@@ -1,3 +1,6 @@
+import random
+
+
 class GameState:
     '''
     Snapshot of information between moves for a two-player, sequential move,
@@ -13,9 +16,12 @@ class GameState:
     WIN: float          -- class constant indicating next player has won
     LOSE: float         -- class constant indicating next player has lost
     DRAW: float         -- class constant indicating next player tied
+    SUPPORTS_PUSH: bool -- class constant indicating that the subclass
+                           implements push_move and pop_move
     '''
     # assign class constants
     WIN, LOSE, DRAW = 1.0, -1.0, 0.0
+    SUPPORTS_PUSH = False
 
     def __init__(self, p, interactive=False):
         '''(GameState, str, bool) -> NoneType
@@ -42,6 +48,47 @@ class GameState:
         else:
             return 'p1'
 
+    def __hash__(self):
+        '''(GameState) -> int
+
+        Return a hash of self, consistent with __eq__.
+        '''
+        return hash(self.key())
+
+    def key(self):
+        '''(GameState) -> object
+
+        Return a compact, hashable key for self. Equal states have equal
+        keys.
+        '''
+        raise NotImplementedError('Method must be implemented in a subclass')
+
+    def canonical(self):
+        '''(GameState) -> tuple of (object, object)
+
+        Return (key, transform), where key is shared by every state that is
+        equivalent to self under the symmetries of the game, and transform
+        maps self onto the state that key describes. By default a game has
+        no symmetries: key is self.key() and transform is None.
+        '''
+        return self.key(), None
+
+    def transform_move(self, move, transform):
+        '''(GameState, Move, object) -> Move
+
+        Return the move that corresponds to move after applying transform,
+        as returned by canonical, to the board.
+        '''
+        return move
+
+    def untransform_move(self, move, transform):
+        '''(GameState, Move, object) -> Move
+
+        Return the move that transform_move maps onto move; that is, map a
+        move on the canonical board back onto the board of self.
+        '''
+        return move
+
     def get_move(self):
         '''(GameState) -> Move
 
@@ -57,6 +104,25 @@ class GameState:
         '''
         raise NotImplementedError('Method must be implemented in a subclass')
 
+    def push_move(self, move):
+        '''(GameState, Move) -> NoneType
+
+        Apply move to state self in place, so that self becomes the state
+        apply_move would return. Undo it with pop_move.
+
+        Assume: move is legal; it is not checked.
+        '''
+        raise NotImplementedError('Method must be implemented in a subclass')
+
+    def pop_move(self):
+        '''(GameState) -> Move
+
+        Undo the most recent push_move on state self and return its move.
+
+        Assume: push_move has been called more often than pop_move.
+        '''
+        raise NotImplementedError('Method must be implemented in a subclass')
+
     def winner(self, player):
         ''' (GameState, str) -> bool
 
@@ -75,6 +141,24 @@ class GameState:
         '''
         raise NotImplementedError('Method must be implemented in a subclass')
 
+    def iter_next_moves(self):
+        ''' (GameState) -> iterator of Move
+
+        Return an iterator over the moves possible_next_moves returns, in
+        the same order. Subclasses may generate them lazily, so a search
+        that stops early does not pay for the rest.
+        '''
+        return iter(self.possible_next_moves())
+
+    def is_legal(self, move):
+        ''' (GameState, Move) -> bool
+
+        Return whether move is legal from the present state. By default
+        move is looked for among possible_next_moves; subclasses check it
+        directly.
+        '''
+        return move in self.possible_next_moves()
+
     def outcome(self):
         ''' (GameState) -> float
 
@@ -97,3 +181,28 @@ class GameState:
         is in interval [LOSE, WIN]
         '''
         raise NotImplementedError('Method must be implemented in a subclass')
+
+    def random_playout(self):
+        '''(GameState) -> float
+
+        Return the outcome for self.next_player of the game played on from
+        self with random moves until it is over. self is left unchanged.
+        '''
+        player, opponent = self.next_player, self.opponent()
+        state, pushed = self, 0
+        while not state.over:
+            move = random.choice(state.possible_next_moves())
+            if state.SUPPORTS_PUSH:
+                state.push_move(move)
+                pushed += 1
+            else:
+                state = state.apply_move(move)
+        if state.winner(player):
+            outcome = GameState.WIN
+        elif state.winner(opponent):
+            outcome = GameState.LOSE
+        else:
+            outcome = GameState.DRAW
+        for _ in range(pushed):
+            state.pop_move()
+        return outcome
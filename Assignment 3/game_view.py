@@ -21,6 +21,8 @@ class GameView:
         elif state == TippyGameState:
             self.state = state(p, 3, None, interactive=True)
         self.strategy = strategy(interactive=True)
+        if self.strategy.RECORDS_STATS:
+            self.strategy.record_stats()
 
     def play(self):
         ''' (GameView) -> NoneType
@@ -33,7 +35,7 @@ class GameView:
         while not self.state.over:
             if self.state.next_player == 'p1':
                 m = self.state.get_move()
-                while not m in self.state.possible_next_moves():
+                while not self.state.is_legal(m):
                     # The move was illegal.
                     print('Illegal move: {}\nPlease try again.\n'.format(m))
                     print(self.state.instructions)
@@ -46,7 +48,10 @@ class GameView:
                 start = timeit.default_timer()
                 m = self.strategy.suggest_move(self.state)
                 stop = timeit.default_timer()
-                print("The runtime is: {}".format(stop-start))
+                if self.strategy.stats is not None:
+                    print(self.strategy.stats)
+                else:
+                    print("The runtime is: {}".format(stop-start))
                 print('The computer chooses: {}'.format(m))
             self.state = self.state.apply_move(m)
             print('New game state: ', str(self.state))
@@ -70,13 +75,25 @@ if __name__ == '__main__':
     from strategy_minimax import StrategyMiniMax
     from strategy_minimax_prune import StrategyMiniMaxPrune
     from strategy_minimax_memoize import StrategyMiniMaxMemoize
+    from strategy_minimax_parallel import StrategyMiniMaxParallel
+    from strategy_iterative_deepening import StrategyIterativeDeepening
+    from strategy_tablebase import StrategyTablebase
+    from strategy_mcts import StrategyMCTS
+    from strategy_proof_number import StrategyProofNumber
+    from strategy_opening_book import StrategyOpeningBook
     strategy = ({'r': StrategyRandom, 'm': StrategyMiniMax, 'mm':
-        StrategyMiniMaxMemoize, 'mp': StrategyMiniMaxPrune})
+        StrategyMiniMaxMemoize, 'mp': StrategyMiniMaxPrune, 'pp':
+        StrategyMiniMaxParallel, 'id': StrategyIterativeDeepening, 'tb':
+        StrategyTablebase, 'mc': StrategyMCTS, 'pn': StrategyProofNumber,
+        'ob': StrategyOpeningBook})
     g = ''
     while not g in game_state.keys():
         g = input('s to play Subtract Square, t to play Tippy: ')
     s = ''
     while not s in strategy.keys():
         s = input('r for random strategy for computer, m for minimax, mm for '
-                  'minimax_memoize:, mp for minimax_prune')
+                  'minimax_memoize:, mp for minimax_prune, pp for '
+                  'minimax_parallel, id for iterative_deepening, tb for '
+                  'tablebase, mc for monte carlo tree search, pn for '
+                  'proof_number, ob for opening_book')
     GameView(game_state[g], strategy[s]).play()
\ No newline at end of file
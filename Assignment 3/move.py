@@ -4,4 +4,5 @@ class Move:
     zero-sum, perfect-information game.
     '''
 
-    # There is nothing to define here!
+    # Moves are immutable, and share no per-instance dict.
+    __slots__ = ()
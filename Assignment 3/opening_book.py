@@ -0,0 +1,273 @@
+""" Opening books: the best move and value of every position in the first
+plies of a game, precomputed and saved to a file.
+
+To build a book of the first 3 plies of Tippy on a 5x5 board, with either
+player first, solved by proof-number search:
+
+    python opening_book.py --game tippy --params '{"n": 5}' --plies 3 \\
+        -o opening_book.bin
+
+Several --params may be given, for example one for each start total of
+Subtract Square. Without arguments, the doctests are run.
+"""
+from strategy_proof_number import StrategyProofNumber
+from game_state import GameState
+from disk_table import stable_key
+from bisect import bisect_left
+import argparse
+import json
+import mmap
+import struct
+import sys
+
+# A book file is a header followed by one entry per position, in order of
+# key: the 64-bit book_key of the position, its value for the player to
+# move, and the index of its best move in possible_next_moves.
+HEADER = struct.Struct('<8sI')
+ENTRY = struct.Struct('<QbH')
+MAGIC = b'OPENBK01'
+
+# Values of positions as stored, with UNKNOWN for positions whose value was
+# not proven.
+VALUE_CODES = {GameState.WIN: 1, GameState.LOSE: -1, GameState.DRAW: 0}
+CODE_VALUES = {code: value for value, code in VALUE_CODES.items()}
+UNKNOWN = 2
+
+
+def book_key(state):
+    """ (GameState) -> int
+
+    Return a 64-bit key for state that is the same in every process: the
+    stable_key of its key.
+
+    >>> from subtract_square_state import SubtractSquareState
+    >>> book_key(SubtractSquareState('p1', current_total=17))
+    15762682833977656775
+    """
+
+    return stable_key(state.key())
+
+
+def opening_positions(states, plies):
+    """ (list of GameState, int) -> list of GameState
+
+    Return every position reached from states in fewer than plies moves
+    whose game is not over, each once.
+
+    >>> from subtract_square_state import SubtractSquareState
+    >>> positions = opening_positions(
+    ...     [SubtractSquareState('p1', current_total=10)], 2)
+    >>> [state.current_total for state in positions]
+    [10, 1, 6, 9]
+    """
+
+    positions, seen = [], set()
+    frontier = list(states)
+    for ply in range(plies):
+        next_frontier = []
+        for state in frontier:
+            key = book_key(state)
+            if state.over or key in seen:
+                continue
+            seen.add(key)
+            positions.append(state)
+            next_frontier.extend(state.apply_move(move)
+                                 for move in state.possible_next_moves())
+        frontier = next_frontier
+    return positions
+
+
+def build_book(path, states, plies, strategy=None):
+    """ (str, list of GameState, int, Strategy) -> int
+
+    Write the book of the positions reached from states in fewer than plies
+    moves to the file at path, and return its number of entries. Each
+    position's move is suggested by strategy, or a StrategyProofNumber if it
+    is None, whose value attribute, if it has one, is the value stored.
+    Positions symmetric to one already searched are not searched again.
+    Raise ValueError, writing nothing, if no position's value is known, as
+    the book would never be used.
+
+    >>> import os, tempfile
+    >>> from subtract_square_state import SubtractSquareState
+    >>> from strategy_minimax_prune import StrategyMiniMaxPrune
+    >>> path = os.path.join(tempfile.mkdtemp(), 'book.bin')
+    >>> build_book(path, [SubtractSquareState('p1', current_total=20)], 2)
+    5
+    >>> build_book(path + '2', [SubtractSquareState('p1', current_total=20)],
+    ...            2, StrategyMiniMaxPrune())
+    Traceback (most recent call last):
+    ...
+    ValueError: no position has a known value; use a strategy that proves one
+    >>> os.path.exists(path + '2')
+    False
+    """
+
+    strategy = strategy or StrategyProofNumber()
+    solved, entries = {}, []
+    for state in opening_positions(states, plies):
+        canonical_key, transform = state.canonical()
+        if canonical_key not in solved:
+            move = strategy.suggest_move(state)
+            solved[canonical_key] = (getattr(strategy, 'value', None),
+                                     state.transform_move(move, transform))
+        value, move = solved[canonical_key]
+        move = state.untransform_move(move, transform)
+        entries.append((book_key(state), VALUE_CODES.get(value, UNKNOWN),
+                        state.possible_next_moves().index(move)))
+    if all(entry[1] == UNKNOWN for entry in entries):
+        raise ValueError('no position has a known value; use a strategy '
+                         'that proves one')
+    entries.sort()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(entries)))
+        for entry in entries:
+            f.write(ENTRY.pack(*entry))
+    return len(entries)
+
+
+class OpeningBook:
+    """ A book file, mapped into memory and searched in place, so that
+    opening even a large book reads nothing but its header.
+
+    path: str -- path of the book
+    """
+
+    def __init__(self, path):
+        """ (OpeningBook, str) -> NoneType
+
+        Open the book at path. Raise ValueError if path is not a book.
+        """
+
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError('not an opening book: {}'.format(path))
+            magic, self._count = HEADER.unpack(header)
+            if (magic != MAGIC or f.seek(0, 2) !=
+                    HEADER.size + self._count * ENTRY.size):
+                raise ValueError('not an opening book: {}'.format(path))
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        """ (OpeningBook) -> int
+
+        Return the number of entries in the book.
+        """
+
+        return self._count
+
+    def get(self, key, default=None):
+        """ (OpeningBook, int, object) -> tuple of (int, int)
+
+        Return the stored value and move index of the entry for the book_key
+        key, found by binary search, or default if there is none.
+        """
+
+        i = bisect_left(range(self._count), key, key=self.key_at)
+        if i == self._count or self.key_at(i) != key:
+            return default
+        return ENTRY.unpack_from(self._data,
+                                 HEADER.size + i * ENTRY.size)[1:]
+
+    def key_at(self, i):
+        """ (OpeningBook, int) -> int
+
+        Return the book_key of entry number i.
+        """
+
+        return ENTRY.unpack_from(self._data, HEADER.size + i * ENTRY.size)[0]
+
+    def close(self):
+        """ (OpeningBook) -> NoneType
+
+        Unmap the book. It cannot be used afterwards.
+        """
+
+        self._data.close()
+
+
+def read_book(path):
+    """ (str) -> OpeningBook
+
+    Return the book at path, whose entries give, for each book_key, the
+    stored value and move index. Raise ValueError if path is not a book.
+
+    >>> import os, tempfile
+    >>> from subtract_square_state import SubtractSquareState
+    >>> path = os.path.join(tempfile.mkdtemp(), 'book.bin')
+    >>> build_book(path, [SubtractSquareState('p1', current_total=20)], 2)
+    5
+    >>> book = read_book(path)
+    >>> len(book), book.get(book_key(SubtractSquareState('p2',
+    ...                                                  current_total=4)))
+    (5, (1, 0))
+    >>> book.get(0) is None
+    True
+    """
+
+    return OpeningBook(path)
+
+
+def probe(book, state):
+    """ (OpeningBook, GameState) -> tuple of (float, Move)
+
+    Return the value of state for its next player (None if unknown) and its
+    best move, as stored in book, or None if state is not in book.
+
+    >>> import os, tempfile
+    >>> from subtract_square_state import SubtractSquareState
+    >>> path = os.path.join(tempfile.mkdtemp(), 'book.bin')
+    >>> state = SubtractSquareState('p1', current_total=20)
+    >>> build_book(path, [state], 1)
+    1
+    >>> probe(read_book(path), state)
+    (-1.0, SubtractSquareMove(16))
+    """
+
+    entry = book.get(book_key(state))
+    if entry is None:
+        return None
+    value, index = entry
+    moves = state.possible_next_moves()
+    if index >= len(moves):
+        return None
+    return CODE_VALUES.get(value), moves[index]
+
+
+def main(args):
+    """ (list of str) -> NoneType
+
+    Build the book described by the command-line arguments args.
+    """
+
+    from self_play import GAMES, STRATEGIES
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--game', choices=sorted(GAMES), required=True)
+    parser.add_argument('--params', type=json.loads, action='append',
+                        help='JSON keyword arguments for a start state')
+    parser.add_argument('--plies', type=int, default=2)
+    # Only strategies that prove values make books worth probing.
+    parser.add_argument('--strategy', default='StrategyProofNumber',
+                        choices=sorted(name for name in STRATEGIES
+                                       if STRATEGIES[name].PROVES_VALUE))
+    parser.add_argument('--strategy-args', type=json.loads, default={},
+                        help='JSON keyword arguments for the strategy')
+    parser.add_argument('-o', '--output', default='opening_book.bin')
+    options = parser.parse_args(args)
+    states = [GAMES[options.game](player, **params)
+              for params in options.params or [{}]
+              for player in ('p1', 'p2')]
+    count = build_book(options.output, states, options.plies,
+                       STRATEGIES[options.strategy](**options.strategy_args))
+    print('Wrote {} positions to {}'.format(count, options.output),
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(sys.argv[1:])
+    else:
+        import doctest
+        doctest.testmod()
@@ -0,0 +1,227 @@
+from contextlib import contextmanager
+from time import perf_counter
+
+# Kinds of work timed by TimedState, and the state methods that do them.
+TIMED_METHODS = {'move generation': ('possible_next_moves',),
+                 'move application': ('apply_move', 'push_move', 'pop_move'),
+                 'win detection': ('winner', 'outcome', 'rough_outcome')}
+
+
+class SearchStats:
+    ''' What a strategy did during its most recent call to suggest_move.
+
+    nodes: int               -- states visited
+    terminals: int           -- visited states where the game is over
+    cutoffs: int             -- times the remaining moves of a state were
+                                pruned
+    hits: int                -- table lookups that found their state
+    misses: int              -- table lookups that did not
+    stores: int              -- table entries stored
+    expanded: list of int    -- states whose moves were generated, by
+                                depth below the state searched
+    children: list of int    -- moves generated, by depth
+    times: dict of {str: float}
+                             -- seconds spent on each kind of work in
+                                TIMED_METHODS
+    elapsed: float           -- seconds spent in suggest_move
+    '''
+
+    def __init__(self):
+        '''(SearchStats) -> NoneType
+
+        Create SearchStats with every count at zero.
+        '''
+        self.reset()
+
+    def reset(self):
+        '''(SearchStats) -> NoneType
+
+        Set every count of self back to zero.
+        '''
+        self.nodes, self.terminals, self.cutoffs = 0, 0, 0
+        self.hits, self.misses, self.stores = 0, 0, 0
+        self.expanded, self.children = [], []
+        self.times = {kind: 0.0 for kind in TIMED_METHODS}
+        self.elapsed = 0.0
+
+    def leaves(self):
+        '''(SearchStats) -> int
+
+        Return the number of visited states whose moves were not generated:
+        states where the game is over, found in a table, or at the depth
+        limit.
+        '''
+        return self.nodes - sum(self.expanded)
+
+    def branching(self):
+        '''(SearchStats) -> list of float
+
+        Return the average number of moves of the expanded states at each
+        depth.
+
+        >>> stats = SearchStats()
+        >>> stats.expanded, stats.children = [1, 3], [3, 6]
+        >>> stats.branching()
+        [3.0, 2.0]
+        '''
+        return [children / expanded
+                for expanded, children in zip(self.expanded, self.children)]
+
+    def __str__(self):
+        '''(SearchStats) -> str
+
+        Return a report of self for users to read.
+
+        >>> print(SearchStats())
+        Runtime: 0.000s; nodes: 0 (0 leaves, 0 terminal); cutoffs: 0
+        Table: 0 hits, 0 misses, 0 stores
+        Branching by depth:
+        Time: move generation 0.000s, move application 0.000s, win detection 0.000s
+        '''
+        return '\n'.join([
+            'Runtime: {:.3f}s; nodes: {} ({} leaves, {} terminal); '
+            'cutoffs: {}'.format(self.elapsed, self.nodes, self.leaves(),
+                                 self.terminals, self.cutoffs),
+            'Table: {} hits, {} misses, {} stores'.format(
+                self.hits, self.misses, self.stores),
+            'Branching by depth:' + ''.join(
+                ' {:.1f}'.format(b) for b in self.branching()),
+            'Time: ' + ', '.join('{} {:.3f}s'.format(kind, seconds)
+                                 for kind, seconds in self.times.items())])
+
+    @contextmanager
+    def measure(self, strategy, state):
+        '''(SearchStats, Strategy, GameState) -> context manager
+
+        Reset self, then yield a TimedState wrapping state for strategy to
+        search, and fill self in when the search is done. strategy.nodes and
+        the counters of strategy.table, if it has one, are read from
+        strategy.
+
+        >>> from strategy_minimax import StrategyMiniMax
+        >>> from subtract_square_state import SubtractSquareState
+        >>> strategy = StrategyMiniMax()
+        >>> strategy.record_stats()
+        >>> strategy.suggest_move(SubtractSquareState('p1', current_total=8))
+        SubtractSquareMove(1)
+        >>> stats = strategy.stats
+        >>> stats.nodes, stats.terminals, stats.leaves(), stats.expanded
+        (25, 7, 7, [1, 2, 3, 4, 5, 1, 1, 1])
+        '''
+        self.reset()
+        table = getattr(strategy, 'table', None)
+        if table is not None:
+            before = table.hits, table.misses, table.stores
+        start = perf_counter()
+        try:
+            yield TimedState(state, self)
+        finally:
+            self.elapsed = perf_counter() - start
+            self.nodes = strategy.nodes
+            if table is not None:
+                self.hits = table.hits - before[0]
+                self.misses = table.misses - before[1]
+                self.stores = table.stores - before[2]
+
+
+class TimedState:
+    ''' A GameState wrapped to time the methods in TIMED_METHODS, and count
+    the moves generated at each depth, into a SearchStats. Everything else
+    is passed through to the state.
+
+    state: GameState   -- the wrapped state
+    stats: SearchStats -- where the times and counts go
+    depth: int         -- moves pushed or applied since the searched state
+    '''
+
+    def __init__(self, state, stats, depth=0):
+        '''(TimedState, GameState, SearchStats, int) -> NoneType
+
+        Wrap state, depth moves below the searched state.
+        '''
+        self.state, self.stats, self.depth = state, stats, depth
+
+    def __getattr__(self, name):
+        '''(TimedState, str) -> object
+
+        Return attribute name of the wrapped state.
+        '''
+        return getattr(self.state, name)
+
+    def timed(self, kind, method, *args):
+        '''(TimedState, str, str, object) -> object
+
+        Return the result of calling method of the wrapped state with args,
+        adding the time it took to the kind of work.
+        '''
+        start = perf_counter()
+        result = getattr(self.state, method)(*args)
+        self.stats.times[kind] += perf_counter() - start
+        return result
+
+    def possible_next_moves(self):
+        '''(TimedState) -> list of Move
+
+        Return the moves of the wrapped state, counting them at this depth.
+        '''
+        moves = self.timed('move generation', 'possible_next_moves')
+        stats = self.stats
+        while len(stats.expanded) <= self.depth:
+            stats.expanded.append(0)
+            stats.children.append(0)
+        stats.expanded[self.depth] += 1
+        stats.children[self.depth] += len(moves)
+        return moves
+
+    def apply_move(self, move):
+        '''(TimedState, Move) -> TimedState
+
+        Return the state reached by move, wrapped one move deeper, or None
+        if move is illegal.
+        '''
+        state = self.timed('move application', 'apply_move', move)
+        if state is None:
+            return None
+        return TimedState(state, self.stats, self.depth + 1)
+
+    def push_move(self, move):
+        '''(TimedState, Move) -> NoneType
+
+        Apply move to the wrapped state in place.
+        '''
+        self.timed('move application', 'push_move', move)
+        self.depth += 1
+
+    def pop_move(self):
+        '''(TimedState) -> Move
+
+        Undo the most recent push_move on the wrapped state.
+        '''
+        self.depth -= 1
+        return self.timed('move application', 'pop_move')
+
+    def winner(self, player):
+        '''(TimedState, str) -> bool
+
+        Return whether player has won the wrapped state.
+        '''
+        return self.timed('win detection', 'winner', player)
+
+    def outcome(self):
+        '''(TimedState) -> float
+
+        Return the outcome of the wrapped state for its next player.
+        '''
+        return self.timed('win detection', 'outcome')
+
+    def rough_outcome(self):
+        '''(TimedState) -> float
+
+        Return the estimated outcome of the wrapped state.
+        '''
+        return self.timed('win detection', 'rough_outcome')
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
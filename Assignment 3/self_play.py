@@ -0,0 +1,167 @@
+""" Headless matches between two strategies, played on a process pool.
+
+For example, to play 1000 games of Tippy on a 4x4 board between alpha-beta
+and random play, and stream the results to games.jsonl:
+
+    python self_play.py --game tippy --params '{"n": 4}' \\
+        --p1 StrategyMiniMaxPrune --p2 StrategyRandom --games 1000 \\
+        -o games.jsonl
+"""
+from subtract_square_state import SubtractSquareState
+from tippy_game_state import TippyGameState
+from strategy_random import StrategyRandom
+from strategy_minimax import StrategyMiniMax
+from strategy_minimax_memoize import StrategyMiniMaxMemoize
+from strategy_minimax_prune import StrategyMiniMaxPrune
+from strategy_iterative_deepening import StrategyIterativeDeepening
+from strategy_subtract_square_table import StrategySubtractSquareTable
+from strategy_tablebase import StrategyTablebase
+from strategy_mcts import StrategyMCTS
+from strategy_proof_number import StrategyProofNumber
+from strategy_opening_book import StrategyOpeningBook
+from multiprocessing import Pool
+from time import perf_counter
+import argparse
+import json
+import random
+import sys
+
+GAMES = {'subtract_square': SubtractSquareState, 'tippy': TippyGameState}
+
+STRATEGIES = {strategy.__name__: strategy for strategy in (
+    StrategyRandom, StrategyMiniMax, StrategyMiniMaxMemoize,
+    StrategyMiniMaxPrune, StrategyIterativeDeepening,
+    StrategySubtractSquareTable, StrategyTablebase, StrategyMCTS,
+    StrategyProofNumber, StrategyOpeningBook)}
+
+
+class Match:
+    ''' A series of games between two strategies.
+
+    game: str             -- name of the game in GAMES
+    params: dict          -- keyword arguments for the game's state, other
+                             than the first player
+    strategies: dict      -- name in STRATEGIES of the strategy playing
+                             'p1', and of the one playing 'p2'
+    strategy_args: dict   -- keyword arguments for each player's strategy
+    seed: int             -- seed of the first game; game i is seeded with
+                             seed + i
+    '''
+
+    def __init__(self, game, params, p1, p2, p1_args=None, p2_args=None,
+                 seed=0):
+        '''(Match, str, dict, str, str, dict, dict, int) -> NoneType
+
+        Create a Match of game, set up with params, between strategies p1
+        and p2, created with p1_args and p2_args.
+        '''
+        self.game, self.params, self.seed = game, params, seed
+        self.strategies = {'p1': p1, 'p2': p2}
+        self.strategy_args = {'p1': p1_args or {}, 'p2': p2_args or {}}
+
+
+def play_game(match, index):
+    '''(Match, int) -> dict
+
+    Play game number index of match, with fresh strategies and the random
+    module seeded with match.seed + index. Players take turns starting
+    first, p1 in even games and p2 in odd ones. Return the record of the
+    game: its number, seed, first player, winner (None for a tie), moves,
+    and the milliseconds each move took to choose. A player suggesting an
+    illegal move loses, and the move is recorded as illegal.
+
+    >>> record = play_game(Match('subtract_square', {'current_total': 21},
+    ...                          'StrategyMiniMaxPrune', 'StrategyRandom'), 0)
+    >>> record['winner'], record['moves'][0]
+    ('p1', 'SubtractSquareMove(16)')
+    '''
+    seed = match.seed + index
+    random.seed(seed)
+    first = 'p1' if index % 2 == 0 else 'p2'
+    state = GAMES[match.game](first, **match.params)
+    players = {player: STRATEGIES[match.strategies[player]](
+                   **match.strategy_args[player])
+               for player in ('p1', 'p2')}
+    record = {'game': index, 'seed': seed, 'first': first,
+              'strategies': match.strategies, 'winner': None, 'moves': [],
+              'latency_ms': []}
+    while not state.over:
+        player = state.next_player
+        start = perf_counter()
+        move = players[player].suggest_move(state)
+        record['latency_ms'].append(1000 * (perf_counter() - start))
+        record['moves'].append(repr(move))
+        if not state.is_legal(move):
+            record['illegal'] = repr(move)
+            record['winner'] = state.opponent()
+            return record
+        state = state.apply_move(move)
+    for player in ('p1', 'p2'):
+        if state.winner(player):
+            record['winner'] = player
+    return record
+
+
+def play_indexed(arguments):
+    '''(tuple of (Match, int)) -> dict
+
+    Return play_game(*arguments), for Pool.imap_unordered.
+    '''
+    return play_game(*arguments)
+
+
+def run_match(match, games, out, workers=None):
+    '''(Match, int, file, int) -> dict of {str: int}
+
+    Play games games of match on a pool of workers processes (one per CPU
+    if None), writing the record of each to out as a line of JSON as soon
+    as it is finished. Return the number of games won by 'p1' and 'p2',
+    and of ties.
+    '''
+    totals = {'p1': 0, 'p2': 0, 'tie': 0}
+    with Pool(workers) as pool:
+        records = pool.imap_unordered(play_indexed,
+                                      ((match, i) for i in range(games)),
+                                      chunksize=max(1, min(64, games // 256)))
+        for record in records:
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            totals[record['winner'] or 'tie'] += 1
+    return totals
+
+
+def main(args):
+    '''(list of str) -> NoneType
+
+    Play the match described by the command-line arguments args, and print
+    its totals.
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--game', choices=sorted(GAMES), required=True)
+    parser.add_argument('--params', type=json.loads, default={},
+                        help='JSON keyword arguments for the game state')
+    parser.add_argument('--p1', choices=sorted(STRATEGIES), required=True)
+    parser.add_argument('--p2', choices=sorted(STRATEGIES), required=True)
+    parser.add_argument('--p1-args', type=json.loads, default={},
+                        help="JSON keyword arguments for p1's strategy")
+    parser.add_argument('--p2-args', type=json.loads, default={},
+                        help="JSON keyword arguments for p2's strategy")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('-o', '--output', help='JSON Lines file to append '
+                        'records to (default: standard output)')
+    options = parser.parse_args(args)
+    match = Match(options.game, options.params, options.p1, options.p2,
+                  options.p1_args, options.p2_args, options.seed)
+    if options.output:
+        with open(options.output, 'a') as out:
+            totals = run_match(match, options.games, out, options.workers)
+    else:
+        totals = run_match(match, options.games, sys.stdout, options.workers)
+    print('p1 won {p1}, p2 won {p2}, {tie} ties'.format(**totals),
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,340 @@
+from multiprocessing import shared_memory
+from disk_table import stable_key
+from subtract_square_move import SubtractSquareMove
+from tippy_move import TippyMove
+import os
+import struct
+
+# A slot is a check word followed by the entry's score, move and metadata.
+# The check word is the entry's stable_key xor the three data words, so
+# reading a slot that another process is halfway through writing gives a
+# wrong key instead of a wrong entry, and no lock is needed.
+SLOT = struct.Struct('<Q24s')
+DATA = struct.Struct('<dQQ')
+WORD = 2 ** 64 - 1
+
+# Odd multiplier spreading keys over the table (2 ** 64 over the golden
+# ratio).
+MIX = 0x9E3779B97F4A7C15
+
+# Classes of the moves a table can hold, by their number in a move word.
+# A move is stored as its class and the (at most two) ints it is pickled
+# by.
+MOVE_CLASSES = (TippyMove, SubtractSquareMove)
+MOVE_ARG_BITS = 28
+
+
+class SharedTranspositionTable:
+    ''' A fixed-size hash table of search results in shared memory, probed
+    and updated by every process that has it, without locks. It is used
+    like a TranspositionTable, and can be passed to worker processes, which
+    attach to the same memory.
+
+    Entries are tuples of a score (an int or float), a move (None, or one of
+    MOVE_CLASSES), and optionally a flag and a search depth (small
+    non-negative ints), as the strategies store them. Each key goes into
+    one of two slots. When both hold other keys, the one searched less deep
+    is replaced, or else the second. A write racing with another process's
+    read or write of the same slot is lost, never mixed up.
+
+    slots: int      -- number of entries the table has room for
+    name: str       -- name of the shared memory block
+    hits: int       -- number of calls to get in this process that found
+                       their key
+    misses: int     -- number of calls to get in this process that did not
+    stores: int     -- number of entries stored by this process
+    evictions: int  -- number of other keys' entries replaced by this
+                       process
+    '''
+
+    def __init__(self, slots=2 ** 20, name=None):
+        '''(SharedTranspositionTable, int, str) -> NoneType
+
+        Create an empty SharedTranspositionTable with room for slots entries
+        (rounded up to an even number), or attach to the existing one whose
+        memory block is called name. The process creating the table owns the
+        block and removes it on close.
+        '''
+        self.slots = slots + slots % 2
+        self.hits, self.misses, self.stores, self.evictions = 0, 0, 0, 0
+        if name is None:
+            self._memory = shared_memory.SharedMemory(
+                create=True, size=self.slots * SLOT.size)
+            self._owner = os.getpid()
+        else:
+            self._memory = shared_memory.SharedMemory(name)
+            self._owner = None
+        self.name = self._memory.name
+        self._buffer = self._memory.buf
+
+    def __repr__(self):
+        '''(SharedTranspositionTable) -> str
+
+        Return a string representation of this SharedTranspositionTable.
+
+        >>> table = SharedTranspositionTable(8)
+        >>> repr(table) == 'SharedTranspositionTable(8, {!r})'.format(
+        ...     table.name)
+        True
+        >>> table.close()
+        '''
+        return 'SharedTranspositionTable({}, {})'.format(
+            repr(self.slots), repr(self.name))
+
+    def __reduce__(self):
+        '''(SharedTranspositionTable) -> tuple
+
+        Return how to pickle this SharedTranspositionTable: by its size and
+        the name of its memory block, so that another process attaches to it.
+
+        >>> import pickle
+        >>> table = SharedTranspositionTable(8)
+        >>> table[17] = (1, None)
+        >>> pickle.loads(pickle.dumps(table)).get(17)
+        (1, None)
+        >>> table.close()
+        '''
+        return (SharedTranspositionTable, (self.slots, self.name))
+
+    def __len__(self):
+        '''(SharedTranspositionTable) -> int
+
+        Return the number of entries in this SharedTranspositionTable, by
+        looking at every slot.
+        '''
+        return sum(1 for offset in range(0, len(self._buffer), SLOT.size)
+                   if self.read(offset) is not None)
+
+    def __contains__(self, key):
+        '''(SharedTranspositionTable, object) -> bool
+
+        Return whether key has an entry. Does not count as a use of it.
+        '''
+        return self.find(stable_key(key)) is not None
+
+    def __getitem__(self, key):
+        '''(SharedTranspositionTable, object) -> tuple
+
+        Return the entry for key. Raise KeyError if there is none.
+        '''
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        '''(SharedTranspositionTable, object, object) -> tuple
+
+        Return the entry for key, or default if there is none. Counts a hit
+        or a miss.
+
+        >>> table = SharedTranspositionTable(8)
+        >>> table[(17, 'p1')] = (1, SubtractSquareMove(16))
+        >>> table.get((17, 'p1')), table.get((16, 'p1'))
+        ((1, SubtractSquareMove(16)), None)
+        >>> table.hits, table.misses
+        (1, 1)
+        >>> table.close()
+        '''
+        found = self.find(stable_key(key))
+        if found is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return found[1]
+
+    def __setitem__(self, key, value):
+        '''(SharedTranspositionTable, object, tuple) -> NoneType
+
+        Store value as the entry for key, in the slot holding key, an empty
+        one or the one searched less deep of its two.
+
+        >>> from transposition_table import LOWER
+        >>> table = SharedTranspositionTable(2)
+        >>> table[1] = (0.5, TippyMove(1, 2), LOWER, 3)
+        >>> table[2] = (-1, None, LOWER, 1)
+        >>> table[3] = (1, None)
+        >>> table.get(1), table.get(2), table.get(3), table.evictions
+        ((0.5, TippyMove(1, 2), 1, 3), None, (1, None), 1)
+        >>> table.close()
+        '''
+        key = stable_key(key)
+        data = DATA.pack(*encode(value))
+        first = self.bucket(key)
+        offsets = (first, first + SLOT.size)
+        slots = [self.read(offset) for offset in offsets]
+        for offset, slot in zip(offsets, slots):
+            if slot is None or slot[0] == key:
+                break
+        else:
+            depths = [slot[1][3] if len(slot[1]) > 3 else 0
+                      for slot in slots]
+            offset = offsets[0] if depths[0] < depths[1] else offsets[1]
+            self.evictions += 1
+        SLOT.pack_into(self._buffer, offset, key ^ fold(data), data)
+        self.stores += 1
+
+    def find(self, key):
+        '''(SharedTranspositionTable, int) -> tuple of (int, tuple)
+
+        Return the stable key and entry in the slot holding the stable key
+        key, or None if neither of its slots does.
+        '''
+        first = self.bucket(key)
+        for offset in (first, first + SLOT.size):
+            check, data = SLOT.unpack_from(self._buffer, offset)
+            # Only decode the slot whose key matches.
+            if check ^ fold(data) == key:
+                value = unpack(data)
+                if value is not None:
+                    return key, value
+        return None
+
+    def bucket(self, key):
+        '''(SharedTranspositionTable, int) -> int
+
+        Return the offset of the first of the two slots for the stable key
+        key. Keys are scrambled first, as the keys of similar states can
+        share their low bits.
+        '''
+        bucket = (key * MIX & WORD) * (self.slots // 2) >> 64
+        return bucket * 2 * SLOT.size
+
+    def read(self, offset):
+        '''(SharedTranspositionTable, int) -> tuple of (int, tuple)
+
+        Return the stable key and entry in the slot at offset, or None if
+        the slot is empty or holds no entry, as a slot another process is
+        writing can. Such a slot is replaced like an empty one.
+
+        >>> table = SharedTranspositionTable(2)
+        >>> table[1] = (1, None)
+        >>> # Half of a write of a TippyMove over a SubtractSquareMove.
+        >>> SLOT.pack_into(table._buffer, 0, 0,
+        ...                DATA.pack(*encode((0, SubtractSquareMove(4))))[:16]
+        ...                + DATA.pack(*encode((0, TippyMove(1, 2))))[16:])
+        >>> table.read(0), len(table)
+        (None, 0)
+        >>> table[1] = (1, None)
+        >>> table.get(1), table.evictions
+        ((1, None), 0)
+        >>> table.close()
+        '''
+        check, data = SLOT.unpack_from(self._buffer, offset)
+        value = unpack(data)
+        if value is None:
+            return None
+        return check ^ fold(data), value
+
+    def clear(self):
+        '''(SharedTranspositionTable) -> NoneType
+
+        Remove every entry from this SharedTranspositionTable, for every
+        process. The counters are kept.
+        '''
+        self._buffer[:] = bytes(len(self._buffer))
+
+    def close(self):
+        '''(SharedTranspositionTable) -> NoneType
+
+        Detach this process from the table, and remove its memory block if
+        this process created it. The table cannot be used afterwards.
+        '''
+        self._buffer.release()
+        self._memory.close()
+        if self._owner == os.getpid():
+            self._memory.unlink()
+
+
+def unpack(data):
+    '''(bytes) -> tuple
+
+    Return the entry whose score, move and metadata words are data, or None
+    if data is an empty slot's or is not any entry's.
+
+    >>> unpack(DATA.pack(*encode((1, None, 0))))
+    (1, None, 0)
+    >>> unpack(DATA.pack(0.0, 1, 1)) is None
+    True
+    '''
+    try:
+        return decode(*DATA.unpack(data))
+    except (TypeError, IndexError, ValueError, OverflowError):
+        # A move word and metadata word from different writes.
+        return None
+
+
+def fold(data):
+    '''(bytes) -> int
+
+    Return the xor of the three 64-bit words of data.
+
+    >>> fold(DATA.pack(0.0, 3, 5))
+    6
+    '''
+    words = int.from_bytes(data, 'little')
+    return (words ^ (words >> 64) ^ (words >> 128)) & WORD
+
+
+def encode(value):
+    '''(tuple) -> tuple of (float, int, int)
+
+    Return the score, move word and metadata word that store the entry
+    value. The metadata word has a bit set in every slot in use, a bit for
+    an int score, the number of ints the move is pickled by, and the flag
+    and depth plus one, with 0 for none.
+
+    >>> encode((1, SubtractSquareMove(4)))
+    (1.0, 1026, 7)
+    '''
+    score, move = value[0], value[1]
+    flag = value[2] if len(value) > 2 else None
+    depth = value[3] if len(value) > 3 else None
+    meta = 1 | isinstance(score, int) << 1
+    if flag is not None:
+        meta |= (flag + 1) << 8
+    if depth is not None:
+        meta |= (depth + 1) << 16
+    word = 0
+    if move is not None:
+        cls, args = move.__reduce__()
+        word = MOVE_CLASSES.index(cls) + 1
+        for i, arg in enumerate(args):
+            if not 0 <= arg < 2 ** MOVE_ARG_BITS:
+                raise ValueError('cannot store move: {!r}'.format(move))
+            word |= arg << (8 + MOVE_ARG_BITS * i)
+        meta |= len(args) << 2
+    return float(score), word, meta
+
+
+def decode(score, word, meta):
+    '''(float, int, int) -> tuple
+
+    Return the entry stored as score, move word word and metadata word meta
+    by encode, or None for an empty slot.
+
+    >>> decode(*encode((-1, TippyMove(2, 0), 0, 5)))
+    (-1, TippyMove(2, 0), 0, 5)
+    >>> decode(0.0, 0, 0) is None
+    True
+    '''
+    if not meta & 1:
+        return None
+    value = (int(score) if meta & 2 else score,)
+    if word:
+        args = [word >> (8 + MOVE_ARG_BITS * i) & (2 ** MOVE_ARG_BITS - 1)
+                for i in range(meta >> 2 & 3)]
+        value += (MOVE_CLASSES[(word & 255) - 1](*args),)
+    else:
+        value += (None,)
+    flag, depth = (meta >> 8 & 255) - 1, (meta >> 16) - 1
+    if depth >= 0:
+        return value + (None if flag < 0 else flag, depth)
+    if flag >= 0:
+        return value + (flag,)
+    return value
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
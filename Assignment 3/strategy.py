@@ -1,15 +1,37 @@
+from search_stats import SearchStats
+
+
 class Strategy:
     '''Interface to suggest moves for a GameState.
 
     Must be subclassed to a concrete strategy.  Our intention is
     to provide a uniform interface for functions that suggest moves.
+
+    stats: SearchStats    -- what the most recent call to suggest_move did,
+                             or None unless record_stats was called
+    RECORDS_STATS: bool   -- class constant indicating that the subclass
+                             fills in stats
+    PROVES_VALUE: bool    -- class constant indicating that the subclass
+                             sets a value attribute to the proven value of
+                             the state of each call to suggest_move
     '''
+    RECORDS_STATS = False
+    PROVES_VALUE = False
 
     def __init__(self, interactive=False):
         '''(Strategy, bool) -> NoneType
 
         Create new Strategy (self), prompt user if interactive.
         '''
+        self.stats = None
+
+    def record_stats(self, enabled=True):
+        '''(Strategy, bool) -> NoneType
+
+        Start filling in self.stats on each call to suggest_move, or stop
+        if not enabled. Searching is slower while stats are recorded.
+        '''
+        self.stats = SearchStats() if enabled else None
 
     def suggest_move(self, state):
         '''(Strategy, GameState) -> Move
@@ -0,0 +1,209 @@
+from strategy import Strategy
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER
+from time import perf_counter
+
+# rough_outcome estimates are scaled by this, so that they always rank below
+# a proven win and above a proven loss.
+ESTIMATE_WEIGHT = 0.5
+
+# Depth stored for a state whose search reached no depth limit: its result
+# does not depend on rough_outcome, so it holds at any depth.
+COMPLETE = 2 ** 16
+
+
+class StrategyIterativeDeepening(Strategy):
+    """
+    AI Controller which determines moves by alpha-beta searches to
+    increasing depths, scoring states at the search depth by rough_outcome,
+    until a time or node budget runs out.
+
+    time_limit: float         -- seconds allowed per call to suggest_move,
+                                 or None for no limit
+    node_limit: int           -- states allowed per call to suggest_move,
+                                 or None for no limit
+    table: TranspositionTable -- scores of searched states, kept across
+                                 calls. Each entry is the score for the
+                                 state's next player, its best move on the
+                                 canonical board, whether the score is
+                                 EXACT or a LOWER or UPPER bound, and the
+                                 depth searched (COMPLETE if no state was
+                                 cut off by the depth).
+    depth: int                -- depth of the last search completed by the
+                                 most recent call to suggest_move
+    nodes: int                -- number of states visited by the most
+                                 recent call to suggest_move
+    """
+    RECORDS_STATS = True
+
+    def __init__(self, interactive=False, time_limit=1.0, node_limit=None,
+                 max_entries=2 ** 20):
+        """(StrategyIterativeDeepening, bool, float, int, int) -> NoneType
+
+        Create new StrategyIterativeDeepening (self) with the given budgets
+        and a table of at most max_entries entries. If interactive, prompt
+        for the time limit.
+        """
+
+        Strategy.__init__(self, interactive)
+        if interactive:
+            time_limit = float(input('Seconds per computer move? '))
+        self.time_limit, self.node_limit = time_limit, node_limit
+        self.table = TranspositionTable(max_entries)
+        self.depth, self.nodes = 0, 0
+        self._deadline, self._frontier = None, False
+
+    def suggest_move(self, state):
+        """(StrategyIterativeDeepening, GameState) -> GameMove
+
+        Return the best move found by the deepest search completed within
+        the budget. The depth 1 search is always completed.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> strategy = StrategyIterativeDeepening(time_limit=None)
+        >>> strategy.suggest_move(SubtractSquareState('p1', current_total=8))
+        SubtractSquareMove(1)
+
+        Later calls keep deepening past the results of earlier ones:
+
+        >>> from tippy_game_state import TippyGameState
+        >>> strategy = StrategyIterativeDeepening(time_limit=None,
+        ...                                       node_limit=5000)
+        >>> state = TippyGameState('p1', n=5)
+        >>> for turn in range(3):
+        ...     state = state.apply_move(strategy.suggest_move(state))
+        >>> strategy.depth > 1
+        True
+        """
+
+        self.nodes = 0
+        if self.stats is None:
+            return self.deepen(state)
+        with self.stats.measure(self, state) as timed_state:
+            return self.deepen(timed_state)
+
+    def deepen(self, state):
+        """(StrategyIterativeDeepening, GameState) -> GameMove
+
+        Return the best move of the deepest search of state completed within
+        the budget, starting the clock now.
+        """
+
+        if self.time_limit is None:
+            self._deadline = None
+        else:
+            self._deadline = perf_counter() + self.time_limit
+        depth, move = 1, None
+        while True:
+            self._frontier = False
+            try:
+                score, best_move = self.search(state, depth, -1, 1,
+                                               depth > 1)
+            except SearchBudgetExceeded:
+                break
+            self.depth, move = depth, best_move
+            # Stop once the result is proven, or no state was cut off.
+            if abs(score) == 1 or not self._frontier:
+                break
+            depth += 1
+        return move
+
+    def search(self, state, depth, alpha, beta, budgeted=True):
+        """(StrategyIterativeDeepening, GameState, int, float, float, bool)
+               -> tuple of (float, GameMove)
+
+        Return the score of state for state.next_player when searched depth
+        moves ahead, and a move that reaches it, or None if the game is
+        over or depth is 0. The score is 1/-1 for a proven win/loss and
+        rough_outcome scaled into the open interval between them otherwise.
+        A returned score no more than alpha is only an upper bound on the
+        real score, and one no less than beta only a lower bound. If
+        budgeted, raise SearchBudgetExceeded when the budget runs out.
+        """
+
+        self.nodes += 1
+        if budgeted and self.nodes & 255 == 0:
+            self.check_budget()
+        if state.over:
+            if self.stats is not None:
+                self.stats.terminals += 1
+            return state.outcome(), None
+        if depth == 0:
+            self._frontier = True
+            return ESTIMATE_WEIGHT * state.rough_outcome(), None
+        key, transform = state.canonical()
+        entry = self.table.get(key)
+        if entry is not None:
+            score, move, flag, searched = entry
+            move = state.untransform_move(move, transform)
+            if searched >= depth and (
+                    flag == EXACT or (flag == LOWER and score >= beta) or
+                    (flag == UPPER and score <= alpha)):
+                # The stored result was cut off by the depth, as a deeper
+                # search of it would be.
+                if searched != COMPLETE:
+                    self._frontier = True
+                return score, move
+        moves = state.possible_next_moves()
+        if entry is not None:
+            # Try the best move of the previous search first.
+            moves.remove(move)
+            moves.insert(0, move)
+        original_alpha = alpha
+        best_score, best_move = -2, None
+        # Whether a state below this one is cut off by the depth.
+        frontier, self._frontier = self._frontier, False
+        for move in moves:
+            # Score each move from the point of view of the player making it
+            if state.SUPPORTS_PUSH:
+                state.push_move(move)
+                try:
+                    score = -self.search(state, depth - 1, -beta, -alpha,
+                                         budgeted)[0]
+                finally:
+                    state.pop_move()
+            else:
+                score = -self.search(state.apply_move(move), depth - 1,
+                                     -beta, -alpha, budgeted)[0]
+            if score > best_score:
+                best_score, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if self.stats is not None:
+                            self.stats.cutoffs += 1
+                        break
+        # No score is below -1 or above 1, so those bounds are exact.
+        if best_score <= original_alpha and best_score > -1:
+            flag = UPPER
+        elif best_score >= beta and best_score < 1:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (best_score,
+                           state.transform_move(best_move, transform), flag,
+                           depth if self._frontier else COMPLETE)
+        self._frontier = frontier or self._frontier
+        return best_score, best_move
+
+    def check_budget(self):
+        """(StrategyIterativeDeepening) -> NoneType
+
+        Raise SearchBudgetExceeded if the time or node budget of the current
+        call to suggest_move has run out.
+        """
+
+        if ((self.node_limit is not None and self.nodes >= self.node_limit)
+                or (self._deadline is not None and
+                    perf_counter() >= self._deadline)):
+            raise SearchBudgetExceeded()
+
+
+class SearchBudgetExceeded(Exception):
+    """
+    Raised inside a search when its time or node budget has run out.
+    """
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,178 @@
+from strategy import Strategy
+from math import log, sqrt
+from time import perf_counter
+import random
+
+
+class StrategyMCTS(Strategy):
+    """
+    AI Controller which determines moves by Monte Carlo tree search (UCT):
+    it grows a tree of states from the current one, choosing which moves to
+    explore by their results so far, and scores each new state by a game
+    played out from it with random moves. The most explored move is
+    returned.
+
+    The subtree below the move returned, and below the opponent's reply, is
+    kept for the next call to suggest_move.
+
+    time_limit: float  -- seconds allowed per call to suggest_move, or None
+                          for no limit
+    iterations: int    -- playouts allowed per call to suggest_move, or None
+                          for no limit
+    exploration: float -- weight of the UCT exploration term
+    playouts: int      -- number of playouts in the most recent call to
+                          suggest_move
+    """
+
+    def __init__(self, interactive=False, time_limit=0.9, iterations=None,
+                 exploration=sqrt(2)):
+        """(StrategyMCTS, bool, float, int, float) -> NoneType
+
+        Create new StrategyMCTS (self) with the given budgets, which must not
+        both be None. If interactive, prompt for the time limit.
+        """
+
+        Strategy.__init__(self, interactive)
+        if interactive:
+            time_limit = float(input('Seconds per computer move? '))
+        self.time_limit, self.iterations = time_limit, iterations
+        self.exploration = exploration
+        self.playouts = 0
+        self._root = None
+
+    def suggest_move(self, state):
+        """(StrategyMCTS, GameState) -> GameMove
+
+        Return the move from state explored most within the budget. At least
+        one playout is run.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> strategy = StrategyMCTS(time_limit=None, iterations=2000)
+        >>> strategy.suggest_move(SubtractSquareState('p1', current_total=8))
+        SubtractSquareMove(1)
+        """
+
+        root = self.reuse_root(state)
+        if root is None:
+            root = SearchNode(None, None, state)
+        self._root = root
+        if self.time_limit is None:
+            deadline = None
+        else:
+            deadline = perf_counter() + self.time_limit
+        self.playouts = 0
+        while True:
+            self.iterate(root, state)
+            self.playouts += 1
+            if ((self.iterations is not None and
+                 self.playouts >= self.iterations) or
+                    (deadline is not None and perf_counter() >= deadline)):
+                break
+        best = max(root.children, key=lambda child: child.visits)
+        self._root = best
+        return best.move
+
+    def reuse_root(self, state):
+        """(StrategyMCTS, GameState) -> SearchNode
+
+        Return the node for state in the tree kept from the previous call
+        to suggest_move, detached from its parent, or None if there is none.
+        """
+
+        if self._root is None:
+            return None
+        key = state.key()
+        for node in [self._root] + self._root.children:
+            if node.key == key:
+                node.parent = None
+                return node
+        return None
+
+    def iterate(self, root, state):
+        """(StrategyMCTS, SearchNode, GameState) -> NoneType
+
+        Select a path from root, the node for state, by UCT, expand the
+        last node by one of its untried moves, play a random game from the
+        new node, and add its result to every node on the path. state is
+        left unchanged.
+        """
+
+        node, pushed = root, 0
+        try:
+            # Selection
+            while not node.untried and node.children:
+                node = self.select(node)
+                if state.SUPPORTS_PUSH:
+                    state.push_move(node.move)
+                    pushed += 1
+                else:
+                    state = state.apply_move(node.move)
+            # Expansion
+            if node.untried:
+                move = node.untried.pop()
+                if state.SUPPORTS_PUSH:
+                    state.push_move(move)
+                    pushed += 1
+                else:
+                    state = state.apply_move(move)
+                node = SearchNode(move, node, state)
+                node.parent.children.append(node)
+            # Simulation
+            if state.over:
+                outcome = state.outcome()
+            else:
+                outcome = state.random_playout()
+        finally:
+            for _ in range(pushed):
+                state.pop_move()
+        # Backpropagation, scoring each node for the player who moved to it
+        reward = (1 - outcome) / 2
+        while node is not None:
+            node.visits += 1
+            node.wins += reward
+            reward = 1 - reward
+            node = node.parent
+
+    def select(self, node):
+        """(StrategyMCTS, SearchNode) -> SearchNode
+
+        Return the child of node with the highest upper confidence bound.
+        """
+
+        scale = self.exploration * sqrt(log(node.visits))
+        return max(node.children,
+                   key=lambda child: (child.wins / child.visits +
+                                      scale / sqrt(child.visits)))
+
+
+class SearchNode:
+    """
+    A state in the tree of a StrategyMCTS.
+
+    move: GameMove                -- move reaching this state from parent's
+    parent: SearchNode            -- node of the previous state, or None
+    children: list of SearchNode  -- nodes of the states explored from here
+    untried: list of GameMove     -- moves not yet explored, in random order
+    visits: int                   -- playouts through this node
+    wins: float                   -- total result of those playouts for the
+                                     player who made move: 1 for a win, 0.5
+                                     for a draw
+    key: object                   -- key of the state
+    """
+
+    def __init__(self, move, parent, state):
+        """(SearchNode, GameMove, SearchNode, GameState) -> NoneType
+
+        Create a node for state, reached by move from parent.
+        """
+
+        self.move, self.parent, self.children = move, parent, []
+        self.untried = [] if state.over else state.possible_next_moves()
+        random.shuffle(self.untried)
+        self.visits, self.wins = 0, 0.0
+        self.key = state.key()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
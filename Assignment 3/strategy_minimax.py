@@ -6,7 +6,23 @@ from tree import Tree
 class StrategyMiniMax(Strategy):
     """
     AI Controller which determines moves based on minimax strategy
+
+    suggest_move only keeps scores along the current line of play; use
+    generate_move_tree to get the whole game tree for analysis.
+
+    nodes: int  -- number of states visited by the most recent call to
+                   suggest_move
     """
+    RECORDS_STATS = True
+
+    def __init__(self, interactive=False):
+        """(StrategyMiniMax, bool) -> NoneType
+
+        Create new StrategyMiniMax (self).
+        """
+
+        Strategy.__init__(self, interactive)
+        self.nodes = 0
 
     def minimax(self, state, initial_player, scores):
         """(StrategyMiniMax, GameState, str, list-of-int) -> int
@@ -26,17 +42,47 @@ class StrategyMiniMax(Strategy):
         current game state
         """
 
-        # Currently fatalistic.
-        move_tree = self.generate_move_tree(state, state.next_player)
-        for move in move_tree.children:
-            if move.value[1] == 1:
-                return move.value[0]
-        for move in move_tree.children:
-            if move.value[1] == 0:
-                return move.value[0]
-        for move in move_tree.children:
-            if move.value[1] == -1:
-                return move.value[0]
+        self.nodes = 0
+        if self.stats is None:
+            return self.search(state)[1]
+        with self.stats.measure(self, state) as timed_state:
+            return self.search(timed_state)[1]
+
+    def search(self, state):
+        """(StrategyMiniMax, GameState) -> tuple of (int, GameMove)
+
+        Return the score (1/0/-1 for a win/tie/loss) of state for
+        state.next_player, and the first of the possible moves that reaches
+        it, or None if the game is over. Only the current line of play is
+        kept in memory.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> StrategyMiniMax().search(SubtractSquareState('p1',
+        ...                                              current_total=8))
+        (1, SubtractSquareMove(1))
+        """
+
+        self.nodes += 1
+        if state.over:
+            if self.stats is not None:
+                self.stats.terminals += 1
+            if state.winner(state.next_player):
+                return 1, None
+            elif state.winner(state.opponent()):
+                return -1, None
+            return 0, None
+        best_score, best_move = -2, None
+        for move in state.possible_next_moves():
+            # Score each move from the point of view of the player making it
+            if state.SUPPORTS_PUSH:
+                state.push_move(move)
+                score = -self.search(state)[0]
+                state.pop_move()
+            else:
+                score = -self.search(state.apply_move(move))[0]
+            if score > best_score:
+                best_score, best_move = score, move
+        return best_score, best_move
 
     def generate_move_tree(self, state, initial_player, chosen_move=None):
         """(StrategyMiniMax, GameState, str, GameMove) -> Tree
@@ -59,10 +105,19 @@ class StrategyMiniMax(Strategy):
             children = []
             scores = []
             for move in possible_moves:
-                new_state = state.apply_move(move)
-                # Recursively generate the children of each move
-                children.append(self.generate_move_tree(new_state,
-                                                        initial_player, move))
+                # Recursively generate the children of each move, in place
+                # if the state supports it
+                if state.SUPPORTS_PUSH:
+                    state.push_move(move)
+                    children.append(self.generate_move_tree(state,
+                                                            initial_player,
+                                                            move))
+                    state.pop_move()
+                else:
+                    new_state = state.apply_move(move)
+                    children.append(self.generate_move_tree(new_state,
+                                                            initial_player,
+                                                            move))
             for child in children:
                 # Collect scores of all children
                 scores.append(child.value[1])
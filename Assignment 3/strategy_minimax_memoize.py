@@ -1,12 +1,44 @@
 from strategy import Strategy
 from game_state import GameState
 from tree import Tree
+from transposition_table import TranspositionTable
 
 
 class StrategyMiniMaxMemoize(Strategy):
     """
     AI Controller which determines moves based on minimax strategy
+
+    suggest_move only keeps scores along the current line of play; use
+    generate_move_tree to get the game tree for analysis.
+
+    table: TranspositionTable -- results of solved states, kept across
+                                 calls to suggest_move and across games.
+                                 Each entry is the score for the state's
+                                 next player and its best move on the
+                                 canonical board. Any table used like a
+                                 TranspositionTable will do, such as a
+                                 DiskTranspositionTable, or a
+                                 SharedTranspositionTable to share results
+                                 with strategies in other processes.
+    nodes: int                -- number of states visited by the most
+                                 recent call to suggest_move
     """
+    RECORDS_STATS = True
+
+    def __init__(self, interactive=False, max_entries=2 ** 20,
+                 max_bytes=None, table=None):
+        """(StrategyMiniMaxMemoize, bool, int, int, object) -> NoneType
+
+        Create new StrategyMiniMaxMemoize (self) that keeps its results in
+        table or, if it is None, in a new TranspositionTable holding at most
+        max_entries entries and about max_bytes bytes; None means no bound.
+        """
+
+        Strategy.__init__(self, interactive)
+        if table is None:
+            table = TranspositionTable(max_entries, max_bytes)
+        self.table = table
+        self.nodes = 0
 
     def minimax(self, state, initial_player, scores):
         """(StrategyMiniMaxMemoize, GameState, str, list-of-int) -> int
@@ -26,19 +58,55 @@ class StrategyMiniMaxMemoize(Strategy):
         current game state
         """
 
-        dictionary = {}
-        # Currently fatalistic.
-        move_tree = self.generate_move_tree(state, state.next_player,
-                                            dictionary)
-        for move in move_tree.children:
-            if move.value[1] == 1:
-                return move.value[0]
-        for move in move_tree.children:
-            if move.value[1] == 0:
-                return move.value[0]
-        for move in move_tree.children:
-            if move.value[1] == -1:
-                return move.value[0]
+        self.nodes = 0
+        if self.stats is None:
+            return self.search(state)[1]
+        with self.stats.measure(self, state) as timed_state:
+            return self.search(timed_state)[1]
+
+    def search(self, state):
+        """(StrategyMiniMaxMemoize, GameState) -> tuple of (int, GameMove)
+
+        Return the score (1/0/-1 for a win/tie/loss) of state for
+        state.next_player, and the first of the possible moves that reaches
+        it, or None if the game is over. States already in self.table, or
+        equivalent to one that is, are not searched again.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> strategy = StrategyMiniMaxMemoize()
+        >>> strategy.search(SubtractSquareState('p1', current_total=8))
+        (1, SubtractSquareMove(1))
+        >>> len(strategy.table)
+        12
+        """
+
+        self.nodes += 1
+        if state.over:
+            if self.stats is not None:
+                self.stats.terminals += 1
+            if state.winner(state.next_player):
+                return 1, None
+            elif state.winner(state.opponent()):
+                return -1, None
+            return 0, None
+        key, transform = state.canonical()
+        entry = self.table.get(key)
+        if entry is not None:
+            return entry[0], state.untransform_move(entry[1], transform)
+        best_score, best_move = -2, None
+        for move in state.possible_next_moves():
+            # Score each move from the point of view of the player making it
+            if state.SUPPORTS_PUSH:
+                state.push_move(move)
+                score = -self.search(state)[0]
+                state.pop_move()
+            else:
+                score = -self.search(state.apply_move(move))[0]
+            if score > best_score:
+                best_score, best_move = score, move
+        self.table[key] = (best_score,
+                           state.transform_move(best_move, transform))
+        return best_score, best_move
 
     def generate_move_tree(self, state, initial_player,
                            dictionary, chosen_move=None):
@@ -47,8 +115,13 @@ class StrategyMiniMaxMemoize(Strategy):
         Return a Tree ADT of the possible moves based on the current state.
         Each node's value will contain the move chosen to arrive at the node,
         and the score (1/0/-1 for a win/tie/loss) in a tuple. The children of
-        the node will be the possible moves from that node. Stores any
-        calculated nodes in dictionary to avoid re-calculation.
+        the node will be the possible moves from that node.
+
+        Stores the result of every calculated state in dictionary, under
+        its canonical key, as a tuple of the score for the state's next
+        player and its best move on the canonical board. A state equivalent
+        to one already calculated is not expanded again: its node gets the
+        stored score and no children.
         """
 
         if state.over:
@@ -58,26 +131,48 @@ class StrategyMiniMaxMemoize(Strategy):
                 return Tree((chosen_move, -1))
             else:
                 return Tree((chosen_move, 0))
-        # Check if current state has already been calculated
-        elif repr(state) in dictionary:
-            return dictionary[repr(state)]
+        key, transform = state.canonical()
+        entry = dictionary.get(key)
+        # Check if an equivalent state has already been calculated
+        if entry is not None:
+            score = entry[0]
+            if state.next_player != initial_player:
+                score = -score
+            return Tree((chosen_move, score))
         else:
             possible_moves = state.possible_next_moves()
             children = []
             scores = []
             for move in possible_moves:
-                new_state = state.apply_move(move)
-                # Recursively generate the children of each move
-                children.append(self.generate_move_tree(new_state,
-                                                        initial_player,
-                                                        dictionary, move))
+                # Recursively generate the children of each move, in place
+                # if the state supports it
+                if state.SUPPORTS_PUSH:
+                    state.push_move(move)
+                    children.append(self.generate_move_tree(state,
+                                                            initial_player,
+                                                            dictionary, move))
+                    state.pop_move()
+                else:
+                    new_state = state.apply_move(move)
+                    children.append(self.generate_move_tree(new_state,
+                                                            initial_player,
+                                                            dictionary, move))
             for child in children:
                 # Collect scores of all children
                 scores.append(child.value[1])
             # Use minimax to chose assigned score
             m_score = self.minimax(state, initial_player, scores)
             # Store results from current game state for future reference
-            dictionary[repr(state)] = Tree((chosen_move, m_score), children)
+            for child in children:
+                if child.value[1] == m_score:
+                    best_move = child.value[0]
+                    break
+            if state.next_player != initial_player:
+                dictionary[key] = (-m_score,
+                                   state.transform_move(best_move, transform))
+            else:
+                dictionary[key] = (m_score,
+                                   state.transform_move(best_move, transform))
             return Tree((chosen_move, m_score), children)
 
 def get_opponent(current_player):
@@ -0,0 +1,187 @@
+from strategy_minimax_prune import StrategyMiniMaxPrune
+from shared_table import SharedTranspositionTable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.sharedctypes import RawArray
+
+# Entry of the shared bounds array for a root move whose score is not known.
+UNKNOWN = -3
+
+# The strategy and shared bounds of a worker process, set by init_worker.
+worker_strategy, worker_bounds = None, None
+
+
+class StrategyMiniMaxParallel(StrategyMiniMaxPrune):
+    """
+    AI Controller which determines moves by alpha-beta search, with the
+    moves possible in the current state searched in parallel by a pool of
+    worker processes.
+
+    Moves reaching symmetric states are searched once. Each worker keeps its
+    own table across calls, or all of them share one, and publishes the scores it proves in a shared
+    array, which the other workers use to narrow their search windows.
+    suggest_move returns the same move as StrategyMiniMaxPrune does from an
+    empty table.
+
+    max_workers: int  -- number of worker processes, or None for one per CPU
+    shared_slots: int -- number of entries of a SharedTranspositionTable
+                         used by every worker instead of its own table, or
+                         None for a table per worker
+    nodes: int        -- number of states visited by all workers in the most
+                         recent call to suggest_move
+
+    The workers do not record stats.
+    """
+    RECORDS_STATS = False
+
+    def __init__(self, interactive=False, max_workers=None,
+                 max_entries=2 ** 20, max_bytes=None, shared_slots=None):
+        """(StrategyMiniMaxParallel, bool, int, int, int, int) -> NoneType
+
+        Create new StrategyMiniMaxParallel (self) with max_workers worker
+        processes, each of whose tables holds at most max_entries entries
+        and about max_bytes bytes; None means no bound. If shared_slots is
+        given, the workers share a table of that many entries instead. The
+        workers are started by the first call to suggest_move.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> state = SubtractSquareState('p1', current_total=20)
+        >>> strategy = StrategyMiniMaxParallel(max_workers=2,
+        ...                                    shared_slots=2 ** 10)
+        >>> strategy.suggest_move(state)
+        SubtractSquareMove(9)
+        >>> first = strategy.nodes
+        >>> strategy.suggest_move(state), strategy.nodes < first
+        (SubtractSquareMove(9), True)
+        >>> strategy.close()
+        """
+
+        StrategyMiniMaxPrune.__init__(self, interactive, max_entries,
+                                      max_bytes)
+        self.max_workers, self.shared_slots = max_workers, shared_slots
+        self._pool, self._bounds, self._shared = None, None, None
+
+    def suggest_move(self, state):
+        """(StrategyMiniMaxParallel, GameState) -> GameMove
+
+        Return a move selected by minimax from the moves possible in the
+        current game state.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> strategy = StrategyMiniMaxParallel(max_workers=2)
+        >>> strategy.suggest_move(SubtractSquareState('p1', current_total=8))
+        SubtractSquareMove(1)
+        >>> strategy.close()
+        """
+
+        self.nodes = 0
+        moves = self.root_moves(state)
+        if len(moves) == 1:
+            return moves[0]
+        pool = self.get_pool(len(moves))
+        for i in range(len(moves)):
+            self._bounds[i] = UNKNOWN
+        futures = [pool.submit(search_root_move, state.apply_move(move), i,
+                               len(moves))
+                   for i, move in enumerate(moves)]
+        best_score, best_move = -2, None
+        for move, future in zip(moves, futures):
+            score, exact, nodes = future.result()
+            self.nodes += nodes
+            # The first move with the best exact score is the one the serial
+            # search returns; the other scores may only be upper bounds.
+            if exact and score > best_score:
+                best_score, best_move = score, move
+        return best_move
+
+    def root_moves(self, state):
+        """(StrategyMiniMaxParallel, GameState) -> list of GameMove
+
+        Return the moves from state in the order of order_moves, leaving out
+        moves that reach a state symmetric to one reached by an earlier move.
+        """
+
+        moves, keys = [], set()
+        for move in self.order_moves(state):
+            key = state.apply_move(move).canonical()[0]
+            if key not in keys:
+                keys.add(key)
+                moves.append(move)
+        return moves
+
+    def get_pool(self, count):
+        """(StrategyMiniMaxParallel, int) -> ProcessPoolExecutor
+
+        Return the pool of worker processes, started with a shared bounds
+        array for at least count moves.
+        """
+
+        if self._pool is None or len(self._bounds) < count:
+            self.close()
+            self._bounds = RawArray('b', max(count, 64))
+            if self.shared_slots is not None:
+                self._shared = SharedTranspositionTable(self.shared_slots)
+            self._pool = ProcessPoolExecutor(
+                self.max_workers, initializer=init_worker,
+                initargs=(self._bounds, self.table.max_entries,
+                          self.table.max_bytes, self._shared))
+        return self._pool
+
+    def close(self):
+        """(StrategyMiniMaxParallel) -> NoneType
+
+        Shut down the worker processes, if they are running, and remove
+        their shared table.
+        """
+
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+
+def init_worker(bounds, max_entries, max_bytes, shared=None):
+    """(RawArray, int, int, SharedTranspositionTable) -> NoneType
+
+    Set up a worker process: its strategy, whose table is shared, or if it
+    is None, holds at most max_entries entries and about max_bytes bytes,
+    and the shared bounds.
+    """
+
+    global worker_strategy, worker_bounds
+    worker_strategy = StrategyMiniMaxPrune(False, max_entries, max_bytes)
+    if shared is not None:
+        worker_strategy.table = shared
+    worker_bounds = bounds
+
+
+def search_root_move(state, index, count):
+    """(GameState, int, int) -> tuple of (int, bool, int)
+
+    Search state, reached by root move number index of count, in a worker.
+    Return the score of the move for the player making it, whether the score
+    is exact, and the number of states visited.
+
+    The score only has to be exact if the move may be the one returned: if
+    it is better than every earlier move and no worse than every later one.
+    So the search window starts above the best earlier score and above one
+    less than the best later score, as far as they are known.
+    """
+
+    bounds = worker_bounds
+    alpha = max([-2] + [bounds[j] for j in range(index)] +
+                [bounds[j] - 1 for j in range(index + 1, count)])
+    if alpha >= 1:
+        return alpha, False, 0
+    worker_strategy.nodes = 0
+    score = -worker_strategy.search(state, -1, -max(alpha, -1))[0]
+    exact = score > alpha
+    if exact:
+        bounds[index] = score
+    return score, exact, worker_strategy.nodes
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
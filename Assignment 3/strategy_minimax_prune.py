@@ -1,12 +1,39 @@
 from strategy import Strategy
 from game_state import GameState
 from tree import Tree
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER
 
 
 class StrategyMiniMaxPrune(Strategy):
     """
-    AI Controller which determines moves based on minimax strategy
+    AI Controller which determines moves based on minimax strategy with
+    alpha-beta pruning
+
+    suggest_move only keeps scores along the current line of play; use
+    generate_move_tree to get the (pruned) game tree for analysis.
+
+    table: TranspositionTable -- scores of searched states, kept across
+                                 calls to suggest_move. Each entry is the
+                                 score for the state's next player, its
+                                 best move on the canonical board, and
+                                 whether the score is EXACT or a LOWER or
+                                 UPPER bound.
+    nodes: int                -- number of states visited by the most
+                                 recent call to suggest_move
     """
+    RECORDS_STATS = True
+
+    def __init__(self, interactive=False, max_entries=2 ** 20,
+                 max_bytes=None):
+        """(StrategyMiniMaxPrune, bool, int, int) -> NoneType
+
+        Create new StrategyMiniMaxPrune (self) whose table holds at most
+        max_entries entries and about max_bytes bytes; None means no bound.
+        """
+
+        Strategy.__init__(self, interactive)
+        self.table = TranspositionTable(max_entries, max_bytes)
+        self.nodes = 0
 
     def minimax(self, state, initial_player, scores):
         """(StrategyMiniMaxPrune, GameState, str, list-of-int) -> int
@@ -26,17 +53,108 @@ class StrategyMiniMaxPrune(Strategy):
         current game state
         """
 
-        # Currently fatalistic.
-        move_tree = self.generate_move_tree(state, state.next_player)
-        for move in move_tree.children:
-            if move.value[1] == 1:
-                return move.value[0]
-        for move in move_tree.children:
-            if move.value[1] == 0:
-                return move.value[0]
-        for move in move_tree.children:
-            if move.value[1] == -1:
-                return move.value[0]
+        self.nodes = 0
+        if self.stats is None:
+            return self.search(state)[1]
+        with self.stats.measure(self, state) as timed_state:
+            return self.search(timed_state)[1]
+
+    def search(self, state, alpha=-1, beta=1):
+        """(StrategyMiniMaxPrune, GameState, int, int) ->
+               tuple of (int, GameMove)
+
+        Return the score (1/0/-1 for a win/tie/loss) of state for
+        state.next_player, and a move that reaches it, or None if the game
+        is over. A returned score no more than alpha is only an upper bound
+        on the real score, and one no less than beta only a lower bound.
+        Moves are tried in the order of order_moves.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> StrategyMiniMaxPrune().search(SubtractSquareState('p1',
+        ...                                                   current_total=8))
+        (1, SubtractSquareMove(1))
+        """
+
+        self.nodes += 1
+        if state.over:
+            if self.stats is not None:
+                self.stats.terminals += 1
+            if state.winner(state.next_player):
+                return 1, None
+            elif state.winner(state.opponent()):
+                return -1, None
+            return 0, None
+        key, transform = state.canonical()
+        entry = self.table.get(key)
+        first = None
+        if entry is not None:
+            score, move, flag = entry
+            move = state.untransform_move(move, transform)
+            if (flag == EXACT or (flag == LOWER and score >= beta) or
+                    (flag == UPPER and score <= alpha)):
+                return score, move
+            first = move
+        original_alpha = alpha
+        best_score, best_move = -2, None
+        for move in self.order_moves(state, first):
+            # Score each move from the point of view of the player making it
+            if state.SUPPORTS_PUSH:
+                state.push_move(move)
+                score = -self.search(state, -beta, -alpha)[0]
+                state.pop_move()
+            else:
+                score = -self.search(state.apply_move(move), -beta,
+                                     -alpha)[0]
+            if score > best_score:
+                best_score, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if self.stats is not None:
+                            self.stats.cutoffs += 1
+                        break
+        # No score is below -1 or above 1, so those bounds are exact.
+        if best_score <= original_alpha and best_score > -1:
+            flag = UPPER
+        elif best_score >= beta and best_score < 1:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (best_score,
+                           state.transform_move(best_move, transform), flag)
+        return best_score, best_move
+
+    def order_moves(self, state, first=None):
+        """(StrategyMiniMaxPrune, GameState, GameMove) -> list of GameMove
+
+        Return the possible moves from state, best first by rough_outcome
+        of the state each one reaches: immediate wins, then moves that leave
+        the opponent no immediate win (blocks among them), then the rest.
+        Move first, if given, goes before all of them.
+        """
+
+        ranked = []
+        for move in state.possible_next_moves():
+            if state.SUPPORTS_PUSH:
+                state.push_move(move)
+                child = state
+            else:
+                child = state.apply_move(move)
+            # Scores are for the opponent, who moves next in child.
+            if child.over:
+                rank = -child.outcome() * 2
+            else:
+                rank = -child.rough_outcome()
+            if state.SUPPORTS_PUSH:
+                state.pop_move()
+            ranked.append((rank, move))
+        # Stable sort: equally ranked moves keep their order.
+        moves = [move for rank, move in
+                 sorted(ranked, key=lambda pair: -pair[0])]
+        if first is not None:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
 
     def generate_move_tree(self, state, initial_player, chosen_move=None):
         """(StrategyMiniMaxPrune, GameState, str, GameMove) -> Tree
@@ -46,7 +164,6 @@ class StrategyMiniMaxPrune(Strategy):
         and the score (1/0/-1 for a win/tie/loss) in a tuple. The children of
         the node will be the possible moves from that node.
         """
-        dictionary = {}
 
         if state.over:
             if state.winner(initial_player):
@@ -60,12 +177,21 @@ class StrategyMiniMaxPrune(Strategy):
             children = []
             scores = []
             for move in possible_moves:
-                new_state = state.apply_move(move)
-                # Recursively generate the children of each move
-                next_node = self.generate_move_tree(new_state,
-                                                    initial_player, move)
+                # Recursively generate the children of each move, in place
+                # if the state supports it
+                if state.SUPPORTS_PUSH:
+                    state.push_move(move)
+                    next_node = self.generate_move_tree(state,
+                                                        initial_player, move)
+                    state.pop_move()
+                else:
+                    new_state = state.apply_move(move)
+                    next_node = self.generate_move_tree(new_state,
+                                                        initial_player, move)
                 children.append(next_node)
                 if self.prune(state, initial_player,next_node.value[1]):
+                    if self.stats is not None:
+                        self.stats.cutoffs += 1
                     return Tree((chosen_move, next_node.value[1]), children)
             for child in children:
                 # Collect scores of all children
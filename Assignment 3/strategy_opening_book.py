@@ -0,0 +1,93 @@
+from strategy import Strategy
+from strategy_iterative_deepening import StrategyIterativeDeepening
+from opening_book import read_book, probe
+
+
+class StrategyOpeningBook(Strategy):
+    """
+    AI Controller which plays the moves of an opening book built by
+    opening_book.build_book whose value is proven, and asks another strategy
+    for the other positions.
+
+    path: str          -- path of the book
+    fallback: Strategy -- strategy for positions not in the book, or
+                          whose value is unknown
+    value: float       -- value for the next player of the position of the
+                          most recent call to suggest_move, from the book,
+                          or None if it is unknown or not in the book
+    """
+
+    def __init__(self, interactive=False, path='opening_book.bin',
+                 fallback=None):
+        """(StrategyOpeningBook, bool, str, Strategy) -> NoneType
+
+        Create new StrategyOpeningBook (self) reading the book at path, with
+        fallback, or a StrategyIterativeDeepening if it is None, for other
+        positions. The book is read on first use.
+        """
+
+        Strategy.__init__(self, interactive)
+        self.path = path
+        self.fallback = fallback or StrategyIterativeDeepening()
+        self.value = None
+        # Entries of the book, or None until it is read.
+        self._book = None
+
+    def suggest_move(self, state):
+        """(StrategyOpeningBook, GameState) -> GameMove
+
+        Return the move for state from the book, or from fallback if state
+        is not in it or its value was not proven.
+
+        >>> import os, tempfile
+        >>> from opening_book import build_book
+        >>> from subtract_square_state import SubtractSquareState
+        >>> path = os.path.join(tempfile.mkdtemp(), 'book.bin')
+        >>> build_book(path, [SubtractSquareState('p1', current_total=29)], 1)
+        1
+        >>> strategy = StrategyOpeningBook(path=path)
+        >>> strategy.suggest_move(SubtractSquareState('p1', current_total=29))
+        SubtractSquareMove(9)
+        >>> strategy.value
+        1.0
+
+        Moves stored without a value are left to the fallback:
+
+        >>> from strategy_minimax_prune import StrategyMiniMaxPrune
+        >>> from strategy_proof_number import StrategyProofNumber
+        >>> build_book(path, [SubtractSquareState('p1', current_total=29)], 2,
+        ...            StrategyProofNumber(node_limit=5))
+        6
+        >>> strategy = StrategyOpeningBook(path=path,
+        ...                                fallback=StrategyMiniMaxPrune())
+        >>> strategy.suggest_move(SubtractSquareState('p1', current_total=29))
+        SubtractSquareMove(9)
+        >>> strategy.value is None, strategy.fallback.nodes > 0
+        (True, True)
+        """
+
+        entry = probe(self.book(), state)
+        if entry is None or entry[0] is None:
+            self.value = None
+            return self.fallback.suggest_move(state)
+        self.value, move = entry
+        return move
+
+    def book(self):
+        """(StrategyOpeningBook) -> OpeningBook
+
+        Return the book, opening it on first use. A missing or unreadable
+        book is empty.
+        """
+
+        if self._book is None:
+            try:
+                self._book = read_book(self.path)
+            except (OSError, ValueError):
+                self._book = {}
+        return self._book
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
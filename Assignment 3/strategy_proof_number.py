@@ -0,0 +1,243 @@
+from strategy import Strategy
+from game_state import GameState
+from transposition_table import TranspositionTable
+from strategy_iterative_deepening import SearchBudgetExceeded
+from time import perf_counter
+
+# Proof and disproof number of a proposition that is settled: the other
+# number of a proven or disproven proposition.
+INFINITY = 10 ** 9
+
+
+class StrategyProofNumber(Strategy):
+    """
+    AI Controller which determines moves by depth-first proof-number search
+    (df-pn): it tries to prove that the next player can force a win, and
+    failing that that the opponent can, always expanding the states where
+    the fewest outcomes are left to settle.
+
+    Each state has two propositions: that its next player can force a win
+    (an OR of its children, since any one winning move will do), and that
+    its next player will lose against best play (an AND: every move must
+    lose). The first is the second for each child, and the other way
+    around, so the two searches share their table.
+
+    node_limit: int           -- states allowed per call to suggest_move,
+                                 or None for no limit
+    time_limit: float         -- seconds allowed per call to suggest_move,
+                                 or None for no limit
+    table: TranspositionTable -- proof and disproof numbers of searched
+                                 propositions, kept across calls. The key of
+                                 an entry is whether the proposition is a
+                                 win (True) or a loss (False) for the next
+                                 player, and the state's canonical key.
+    value: float              -- what the most recent call to suggest_move
+                                 proved about its state for the next
+                                 player: WIN, LOSE or DRAW, or None if the
+                                 budget ran out first
+    nodes: int                -- number of states visited by the most
+                                 recent call to suggest_move
+    """
+    RECORDS_STATS = True
+    PROVES_VALUE = True
+
+    def __init__(self, interactive=False, node_limit=10 ** 6, time_limit=None,
+                 max_entries=2 ** 21):
+        """(StrategyProofNumber, bool, int, float, int) -> NoneType
+
+        Create new StrategyProofNumber (self) with the given budgets and a
+        table of at most max_entries entries.
+        """
+
+        Strategy.__init__(self, interactive)
+        self.node_limit, self.time_limit = node_limit, time_limit
+        self.table = TranspositionTable(max_entries)
+        self.value, self.nodes = None, 0
+        self._deadline = None
+
+    def suggest_move(self, state):
+        """(StrategyProofNumber, GameState) -> GameMove
+
+        Return a move for state: a winning move if a win is proven, a drawing
+        move if a draw is, and otherwise the move whose win is closest to
+        being proven. Set value to what was proven.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> from tippy_game_state import TippyGameState
+        >>> strategy = StrategyProofNumber()
+        >>> strategy.suggest_move(SubtractSquareState('p1', current_total=8))
+        SubtractSquareMove(1)
+        >>> strategy.value
+        1.0
+        >>> strategy.suggest_move(SubtractSquareState('p1', current_total=7))
+        SubtractSquareMove(4)
+        >>> strategy.value
+        -1.0
+        >>> strategy.suggest_move(TippyGameState('p1', 3))
+        TippyMove(1, 1)
+        >>> strategy.value
+        1.0
+        """
+
+        self.nodes = 0
+        if self.stats is None:
+            return self.prove_move(state)
+        with self.stats.measure(self, state) as timed_state:
+            return self.prove_move(timed_state)
+
+    def prove_move(self, state):
+        """(StrategyProofNumber, GameState) -> GameMove
+
+        Settle what state is worth to its next player within the budget,
+        starting the clock now, then return the move suggest_move returns.
+        """
+
+        if self.time_limit is None:
+            self._deadline = None
+        else:
+            self._deadline = perf_counter() + self.time_limit
+        self.value = None
+        try:
+            win = self.prove(state, True)
+            if win[0] == 0:
+                self.value = GameState.WIN
+            else:
+                loss = self.prove(state, False)
+                if loss[0] == 0:
+                    self.value = GameState.LOSE
+                elif win[1] == 0 and loss[1] == 0:
+                    self.value = GameState.DRAW
+        except SearchBudgetExceeded:
+            pass
+        return self.best_move(state)
+
+    def prove(self, state, win):
+        """(StrategyProofNumber, GameState, bool) -> tuple of (int, int)
+
+        Search until the proposition that the next player of state wins,
+        if win, or loses otherwise, is proven or disproven. Return its
+        proof and disproof numbers: (0, INFINITY) if it is proven and
+        (INFINITY, 0) if it is disproven.
+        """
+
+        return self.search(state, win, INFINITY, INFINITY)
+
+    def search(self, state, win, proof_limit, disproof_limit):
+        """(StrategyProofNumber, GameState, bool, int, int)
+               -> tuple of (int, int)
+
+        Search the proposition that the next player of state wins, if win,
+        or loses otherwise, until its proof number reaches proof_limit or
+        its disproof number reaches disproof_limit, and return them. Raise
+        SearchBudgetExceeded when the budget runs out.
+        """
+
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchBudgetExceeded()
+        if (self._deadline is not None and self.nodes & 255 == 0 and
+                perf_counter() >= self._deadline):
+            raise SearchBudgetExceeded()
+        if state.over:
+            if self.stats is not None:
+                self.stats.terminals += 1
+            return settled(state, win)
+        key = (win, state.canonical()[0])
+        # The key of each move's proposition about the state it reaches,
+        # with the terminal ones settled in the table straight away.
+        children = []
+        for move in state.possible_next_moves():
+            if state.SUPPORTS_PUSH:
+                state.push_move(move)
+                child = state
+            else:
+                child = state.apply_move(move)
+            child_key = (not win, child.canonical()[0])
+            if child.over:
+                self.table[child_key] = settled(child, not win)
+            if state.SUPPORTS_PUSH:
+                state.pop_move()
+            children.append((move, child_key))
+        while True:
+            numbers = [self.table.get(child_key, (1, 1))
+                       for move, child_key in children]
+            # Write the numbers of the children as (numbers for the
+            # proposition of state that are minimised, that are summed).
+            if win:
+                pairs = numbers
+            else:
+                pairs = [(disproof, proof) for proof, disproof in numbers]
+            least = min(pair[0] for pair in pairs)
+            total = min(sum(pair[1] for pair in pairs), INFINITY)
+            least_limit, total_limit = ((proof_limit, disproof_limit) if win
+                                        else (disproof_limit, proof_limit))
+            if least >= least_limit or total >= total_limit:
+                break
+            # Search the child with the least, until it is no longer less
+            # than the second least, or the total reaches its limit.
+            index = min(range(len(pairs)), key=lambda i: pairs[i][0])
+            second = min([pair[0] for i, pair in enumerate(pairs)
+                          if i != index] + [INFINITY])
+            child_least = min(least_limit, second + 1)
+            child_total = total_limit - total + pairs[index][1]
+            if win:
+                child_limits = (child_least, child_total)
+            else:
+                child_limits = (child_total, child_least)
+            move = children[index][0]
+            if state.SUPPORTS_PUSH:
+                state.push_move(move)
+                try:
+                    self.search(state, not win, *child_limits)
+                finally:
+                    state.pop_move()
+            else:
+                self.search(state.apply_move(move), not win, *child_limits)
+        result = (least, total) if win else (total, least)
+        self.table[key] = result
+        return result
+
+    def best_move(self, state):
+        """(StrategyProofNumber, GameState) -> GameMove
+
+        Return the move suggest_move returns for state, from the table.
+        """
+
+        best_rank, best_move = None, None
+        for move in state.possible_next_moves():
+            if state.SUPPORTS_PUSH:
+                state.push_move(move)
+                child = state
+            else:
+                child = state.apply_move(move)
+            key = child.canonical()[0]
+            if state.SUPPORTS_PUSH:
+                state.pop_move()
+            loss = self.table.get((False, key), (1, 1))
+            if self.value == GameState.DRAW:
+                # A move after which the opponent cannot force a win.
+                rank = self.table.get((True, key), (1, 1))[1]
+            else:
+                rank = loss[0]
+            if best_rank is None or rank < best_rank:
+                best_rank, best_move = rank, move
+        return best_move
+
+
+def settled(state, win):
+    """(GameState, bool) -> tuple of (int, int)
+
+    Return the proof and disproof numbers of the proposition that the next
+    player of state, where the game is over, has won, if win, or lost
+    otherwise.
+    """
+
+    player = state.next_player if win else state.opponent()
+    if state.winner(player):
+        return 0, INFINITY
+    return INFINITY, 0
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,43 @@
+from strategy import Strategy
+from subtract_square_state import win_table, square_moves_upto
+
+
+class StrategySubtractSquareTable(Strategy):
+    ''' Interface to suggest perfect moves in Subtract Square by looking them
+    up in the solved table of wins and losses.
+    '''
+
+    def suggest_move(self, state):
+        '''(StrategySubtractSquareTable, SubtractSquareState)
+               -> SubtractSquareMove
+
+        Return the largest square that leaves the opponent a losing total,
+        or the largest square if there is none: the move the minimax
+        strategies choose.
+
+        Overrides Strategy.suggest_move
+
+        Assume: state is a SubtractSquareState that is not over.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> strategy = StrategySubtractSquareTable()
+        >>> strategy.suggest_move(SubtractSquareState('p1', current_total=8))
+        SubtractSquareMove(1)
+        >>> strategy.suggest_move(SubtractSquareState('p1', current_total=5))
+        SubtractSquareMove(4)
+        >>> state = SubtractSquareState('p1', current_total=5)
+        >>> strategy.suggest_move(state) is state.possible_next_moves()[0]
+        True
+        '''
+        total = state.current_total
+        wins = win_table(total)
+        moves = square_moves_upto(total)
+        for move in reversed(moves):
+            if not wins[total - move.amount]:
+                return move
+        return moves[-1]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
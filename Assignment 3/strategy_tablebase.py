@@ -0,0 +1,75 @@
+from strategy import Strategy
+from strategy_minimax_prune import StrategyMiniMaxPrune
+from tippy_game_state import TippyGameState, move_table
+from tippy_tablebase import open_tablebase, probe, UNKNOWN
+
+
+class StrategyTablebase(Strategy):
+    """
+    AI Controller which looks Tippy moves up in a tablebase built by
+    tippy_tablebase.build_tablebase, and asks another strategy about
+    positions no tablebase covers.
+
+    path: str          -- path of the tablebase for each sidelength, with
+                          {} standing for the sidelength
+    fallback: Strategy -- strategy for positions not in a tablebase
+    """
+
+    def __init__(self, interactive=False, path='tippy_{}.tb', fallback=None):
+        """(StrategyTablebase, bool, str, Strategy) -> NoneType
+
+        Create new StrategyTablebase (self) reading the tablebases at path,
+        with fallback, or a StrategyMiniMaxPrune if it is None, for other
+        positions. Tablebases are opened on first use.
+        """
+
+        Strategy.__init__(self, interactive)
+        self.path = path
+        self.fallback = fallback or StrategyMiniMaxPrune()
+        # Mapped tablebase for each sidelength, or None if there is none.
+        self._tables = {}
+
+    def suggest_move(self, state):
+        """(StrategyTablebase, GameState) -> GameMove
+
+        Return the best move for state from its tablebase: of the moves with
+        the best value, the first in the order of possible_next_moves.
+
+        >>> import os, tempfile
+        >>> from tippy_tablebase import build_tablebase
+        >>> path = os.path.join(tempfile.mkdtemp(), 'tippy_{}.tb')
+        >>> build_tablebase(path.format(3), 3)
+        >>> strategy = StrategyTablebase(path=path)
+        >>> strategy.suggest_move(TippyGameState('p1', 3))
+        TippyMove(1, 1)
+        """
+
+        table = self.tablebase_for(state)
+        if table is not None:
+            value, cell = probe(table, state)
+            if value != UNKNOWN:
+                return move_table(state.n)[cell]
+        return self.fallback.suggest_move(state)
+
+    def tablebase_for(self, state):
+        """(StrategyTablebase, GameState) -> mmap
+
+        Return the mapped tablebase for the board of state, or None if state
+        is not a TippyGameState or there is no complete tablebase for its
+        sidelength.
+        """
+
+        if not isinstance(state, TippyGameState):
+            return None
+        if state.n not in self._tables:
+            try:
+                n, table = open_tablebase(self.path.format(state.n))
+            except (OSError, ValueError):
+                n, table = None, None
+            self._tables[state.n] = table if n == state.n else None
+        return self._tables[state.n]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
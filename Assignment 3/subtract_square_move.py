@@ -4,8 +4,12 @@ from move import Move
 class SubtractSquareMove(Move):
     ''' A move in the game of Subtract Square.
 
+    SubtractSquareMoves are immutable: SubtractSquareState hands out one
+    shared instance per square, from square_moves_upto.
+
     amount: int -- amount to subtract from current value.
     '''
+    __slots__ = ('amount',)
 
     def __init__(self, amount):
         ''' (SubtractSquareMove, int) -> NoneType
@@ -52,6 +56,27 @@ class SubtractSquareMove(Move):
         return (isinstance(other, SubtractSquareMove) and 
                 self.amount == other.amount)
 
+    def __hash__(self):
+        ''' (SubtractSquareMove) -> int
+
+        Return a hash of this SubtractSquareMove, consistent with __eq__.
+
+        >>> len({SubtractSquareMove(4), SubtractSquareMove(4)})
+        1
+        '''
+        return hash(self.amount)
+
+    def __reduce__(self):
+        ''' (SubtractSquareMove) -> tuple
+
+        Return how to pickle this SubtractSquareMove: by its amount.
+
+        >>> import pickle
+        >>> pickle.loads(pickle.dumps(SubtractSquareMove(4)))
+        SubtractSquareMove(4)
+        '''
+        return (SubtractSquareMove, (self.amount,))
+
 
 if __name__ == '__main__':
     import doctest
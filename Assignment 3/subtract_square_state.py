@@ -1,7 +1,21 @@
 from game_state import GameState
 from subtract_square_move import SubtractSquareMove
-from math import sqrt
+from math import isqrt
 from random import randint
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The positive squares in ascending order, and a move removing each,
+# shared by every state and extended by squares_upto as larger totals come
+# up.
+_squares = [1]
+_square_moves = [SubtractSquareMove(1)]
+
+# Whether the player to move wins from each total, from 0 up: built on first
+# use by win_table, and extended by doubling when a larger total is needed.
+_win_table = None
 
 
 class SubtractSquareState(GameState):
@@ -9,6 +23,7 @@ class SubtractSquareState(GameState):
 
     current_total: int   --- total to be subtracted from
     '''
+    SUPPORTS_PUSH = True
 
     def __init__(self, p, interactive=False, current_total=0):
         ''' (SubtractSquareState, int, str) -> NoneType
@@ -25,6 +40,8 @@ class SubtractSquareState(GameState):
         GameState.__init__(self, p)
         self.current_total = current_total
         self.over = (current_total < 1)
+        # Moves applied by push_move, most recent last.
+        self._undo = []
         self.instructions = ('On your turn, you may remove any number so long '
                              'as it is (a) a perfect square, and '
                              '(b) no more than the current number.')
@@ -68,6 +85,42 @@ class SubtractSquareState(GameState):
                 self.current_total == other.current_total and
                 self.next_player == other.next_player)
 
+    def __hash__(self):
+        ''' (SubtractSquareState) -> int
+
+        Return a hash of SubtractSquareState self, consistent with __eq__.
+
+        >>> s1 = SubtractSquareState('p1', current_total=17)
+        >>> s2 = SubtractSquareState('p1', current_total=17)
+        >>> hash(s1) == hash(s2)
+        True
+        '''
+        return hash((self.current_total, self.next_player))
+
+    def key(self):
+        ''' (SubtractSquareState) -> tuple of (int, str)
+
+        Return a compact key for SubtractSquareState self.
+
+        >>> SubtractSquareState('p2', current_total=17).key()
+        (17, 'p2')
+        '''
+        return (self.current_total, self.next_player)
+
+    def __reduce__(self):
+        ''' (SubtractSquareState) -> tuple
+
+        Return how to pickle SubtractSquareState self: by its player and
+        total. The undo records of push_move are not kept.
+
+        >>> import pickle
+        >>> s = SubtractSquareState('p2', current_total=17)
+        >>> pickle.loads(pickle.dumps(s)) == s
+        True
+        '''
+        return (SubtractSquareState,
+                (self.next_player, False, self.current_total))
+
     def apply_move(self, move):
         ''' (SubtractSquareState, SubtractSquareMove) -> SubtractSquareState
 
@@ -78,18 +131,49 @@ class SubtractSquareState(GameState):
         >>> print(s2)
         Current total: 8; next player: p2
         '''
-        if move in self.possible_next_moves():
+        if self.is_legal(move):
             new_total = self.current_total - move.amount
             return SubtractSquareState(self.opponent(),
                                        current_total=new_total)
         else:
             return None
 
+    def push_move(self, move):
+        ''' (SubtractSquareState, SubtractSquareMove) -> NoneType
+
+        Subtract move from self in place.
+
+        >>> s = SubtractSquareState('p1', current_total=17)
+        >>> s.push_move(SubtractSquareMove(9))
+        >>> print(s)
+        Current total: 8; next player: p2
+        >>> s.pop_move()
+        SubtractSquareMove(9)
+        >>> print(s)
+        Current total: 17; next player: p1
+        '''
+        self._undo.append(move)
+        self.current_total -= move.amount
+        self.next_player = self.opponent()
+        self.over = (self.current_total < 1)
+
+    def pop_move(self):
+        ''' (SubtractSquareState) -> SubtractSquareMove
+
+        Undo the most recent push_move on self and return its move.
+        '''
+        move = self._undo.pop()
+        self.current_total += move.amount
+        self.next_player = self.opponent()
+        self.over = (self.current_total < 1)
+        return move
+
     def rough_outcome(self):
         '''(SubtractSquareState) -> float
 
         Return an estimate in interval [LOSE, WIN] of best outcome next_player
-        can guarantee from state self.
+        can guarantee from state self. The estimate is exact if win_table
+        already covers the current total.
 
         >>> SubtractSquareState('p1', current_total=0).rough_outcome()
         -1.0
@@ -100,11 +184,15 @@ class SubtractSquareState(GameState):
         >>> SubtractSquareState('p1', current_total=16).rough_outcome()
         1.0
         '''
-        if is_pos_square(self.current_total):
+        if (_win_table is not None and
+                self.current_total < len(_win_table)):
+            if _win_table[self.current_total]:
+                return SubtractSquareState.WIN
+            return SubtractSquareState.LOSE
+        elif is_pos_square(self.current_total):
             return SubtractSquareState.WIN
-        elif all([is_pos_square(self.current_total - n**2)
-                  for n in range(1, self.current_total + 1)
-                  if n**2 < self.current_total]):
+        elif all([is_pos_square(self.current_total - square)
+                  for square in squares_upto(self.current_total - 1)]):
             return SubtractSquareState.LOSE
         else:
             return SubtractSquareState.DRAW
@@ -145,9 +233,144 @@ class SubtractSquareState(GameState):
         >>> len(L1) == len(L2) and all([m in L2 for m in L1])
         True
         '''
-        return [SubtractSquareMove(i**2)
-                for i in range(self.current_total, 0, -1)
-                if i*i <= self.current_total]
+        return square_moves_upto(self.current_total)[::-1]
+
+    def iter_next_moves(self):
+        ''' (SubtractSquareState) -> iterator of SubtractSquareMove
+
+        Generate the moves possible_next_moves returns, in the same order:
+        largest square first.
+
+        >>> s1 = SubtractSquareState('p1', current_total=17)
+        >>> next(s1.iter_next_moves())
+        SubtractSquareMove(16)
+        '''
+        moves = square_moves_upto(self.current_total)
+        for i in range(len(moves) - 1, -1, -1):
+            yield moves[i]
+
+    def is_legal(self, move):
+        ''' (SubtractSquareState, SubtractSquareMove) -> bool
+
+        Return whether move removes a positive square no more than the
+        current total.
+
+        >>> s1 = SubtractSquareState('p1', current_total=17)
+        >>> s1.is_legal(SubtractSquareMove(16))
+        True
+        >>> s1.is_legal(SubtractSquareMove(8)), s1.is_legal(SubtractSquareMove(25))
+        (False, False)
+        '''
+        return (isinstance(move, SubtractSquareMove) and
+                0 < move.amount <= self.current_total and
+                is_pos_square(move.amount))
+
+
+def squares_upto(total):
+    '''(int) -> list of int
+
+    Return the positive squares no more than total, in ascending order,
+    sliced from a list of squares that is shared and grows by doubling.
+
+    >>> squares_upto(17)
+    [1, 4, 9, 16]
+    >>> squares_upto(0)
+    []
+    '''
+    global _squares, _square_moves
+    count = isqrt(max(total, 0))
+    if count > len(_squares):
+        _squares = [i * i for i in range(1, 2 * count + 1)]
+        _square_moves = [SubtractSquareMove(square) for square in _squares]
+    return _squares[:count]
+
+
+def square_moves_upto(total):
+    '''(int) -> list of SubtractSquareMove
+
+    Return the moves removing each positive square no more than total, in
+    ascending order. The moves are shared, like the squares of
+    squares_upto.
+
+    >>> square_moves_upto(10)
+    [SubtractSquareMove(1), SubtractSquareMove(4), SubtractSquareMove(9)]
+    >>> square_moves_upto(10)[2] is square_moves_upto(9)[2]
+    True
+    '''
+    count = isqrt(max(total, 0))
+    if count > len(_square_moves):
+        squares_upto(total)
+    return _square_moves[:count]
+
+
+def win_table(total):
+    '''(int) -> sequence of bool
+
+    Return a table of whether the player to move wins from each total, for
+    totals from 0 to at least total. The table is solved bottom up, once,
+    and extended by doubling its size when a larger total is asked for. It
+    is a NumPy array if NumPy is installed, and a bytearray otherwise.
+
+    >>> table = win_table(20)
+    >>> [total for total in range(21) if not table[total]]
+    [0, 2, 5, 7, 10, 12, 15, 17, 20]
+    '''
+    global _win_table
+    if _win_table is None:
+        _win_table = solve_win_table(None, max(total + 1, 1024))
+    elif total >= len(_win_table):
+        _win_table = solve_win_table(_win_table,
+                                     max(total + 1, 2 * len(_win_table)))
+    return _win_table
+
+
+def solve_win_table(table, size):
+    '''(sequence of bool, int) -> sequence of bool
+
+    Return a table of whether the player to move wins from each total below
+    size, extending table, which is solved for the totals below its length,
+    or None. A total is a loss if it is 0 or every square that can be
+    subtracted from it leaves a win, so each loss makes a win of itself
+    plus every square. Takes O(size * sqrt(size)) time at most.
+
+    >>> [bool(win) for win in solve_win_table(solve_win_table(None, 4), 8)]
+    [False, True, False, True, True, False, True, False]
+    '''
+    start = 0 if table is None else len(table)
+    squares = squares_upto(size - 1)
+    if numpy is not None:
+        squares = numpy.array(squares, dtype=numpy.int64)
+        wins = numpy.zeros(size, dtype=bool)
+        wins[:start] = table if table is not None else []
+        losses = numpy.flatnonzero(~wins[:start])
+    else:
+        wins = bytearray(size)
+        wins[:start] = bytes(table) if table is not None else b''
+        losses = [total for total in range(start) if not wins[total]]
+    # Losses already solved make wins of totals beyond the old table.
+    for total in losses:
+        mark_wins(wins, total, squares, start)
+    for total in range(start, size):
+        if not wins[total]:
+            mark_wins(wins, total, squares, total + 1)
+    return wins
+
+
+def mark_wins(wins, total, squares, start):
+    '''(sequence of bool, int, sequence of int, int) -> NoneType
+
+    Mark total plus each of squares, which are ascending, as a win in wins,
+    leaving out the sums below start or beyond the table.
+    '''
+    if numpy is not None:
+        totals = total + squares
+        wins[totals[(totals >= start) & (totals < len(wins))]] = True
+    else:
+        for square in squares:
+            if total + square >= len(wins):
+                break
+            if total + square >= start:
+                wins[total + square] = 1
 
 
 def is_pos_square(n):
@@ -160,8 +383,7 @@ def is_pos_square(n):
     >>> is_pos_square(9)
     True
     '''
-    from math import sqrt
-    return round(sqrt(n))**2 == n and n > 0
+    return n > 0 and isqrt(n) ** 2 == n
 
 
 if __name__ == '__main__':
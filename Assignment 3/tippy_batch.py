@@ -0,0 +1,281 @@
+from tippy_game_state import TippyGameState, shift_table
+import numpy
+
+# Outcomes for the next player, as in GameState.
+WIN, LOSE, DRAW = TippyGameState.WIN, TippyGameState.LOSE, \
+    TippyGameState.DRAW
+
+
+class TippyBatch:
+    """ Many Tippy games on boards of the same sidelength, stored as arrays
+    with one entry per board so that moves and win detection run on every
+    board at once.
+
+    The boards are bitboards as in TippyGameState: cell (x, y) is bit
+    x * n + y, so n is at most 8. A move is given as its cell, or -1 to
+    leave a board unchanged.
+
+    n: int                  -- sidelength of the boards
+    p1_bits: numpy.ndarray  -- uint64 bitboards of p1's pieces
+    p2_bits: numpy.ndarray  -- uint64 bitboards of p2's pieces
+    p2_next: numpy.ndarray  -- bools: whether p2 is the next player
+    p1_tippy: numpy.ndarray -- bools: whether p1's pieces contain a tippy
+    p2_tippy: numpy.ndarray -- bools: whether p2's pieces contain a tippy
+    over: numpy.ndarray     -- bools: whether the game is over
+    """
+
+    def __init__(self, n, p1_bits, p2_bits, p2_next):
+        """ (TippyBatch, int, array of int, array of int, array of bool)
+            -> NoneType
+
+        Initialize TippyBatch self with the boards of sidelength n whose
+        bitboards are p1_bits and p2_bits and whose next players are p2
+        where p2_next is True.
+
+        >>> batch = TippyBatch(3, [0b000011110, 0], [0, 0], [True, False])
+        >>> batch.p1_tippy.tolist()
+        [True, False]
+        """
+
+        if not 0 < n <= 8:
+            raise ValueError('TippyBatch boards have at most 8 rows')
+        self.n = n
+        self.p1_bits = numpy.asarray(p1_bits, dtype=numpy.uint64)
+        self.p2_bits = numpy.asarray(p2_bits, dtype=numpy.uint64)
+        self.p2_next = numpy.asarray(p2_next, dtype=bool)
+        self.p1_tippy = has_tippy(self.p1_bits, n)
+        self.p2_tippy = has_tippy(self.p2_bits, n)
+        self.over = self.p1_tippy | self.p2_tippy | (self.free_cells() == 0)
+
+    def __len__(self):
+        """ (TippyBatch) -> int
+
+        Return the number of boards in self.
+        """
+
+        return len(self.p1_bits)
+
+    def free_cells(self):
+        """ (TippyBatch) -> numpy.ndarray
+
+        Return the uint64 bitboards of the empty cells of self's boards:
+        the legal moves of each board whose game is not over.
+        """
+
+        return full_board(self.n) & ~(self.p1_bits | self.p2_bits)
+
+    def legal_moves(self):
+        """ (TippyBatch) -> numpy.ndarray
+
+        Return a bool array with a row for each board and a column for each
+        cell, True where placing a piece is legal.
+
+        >>> batch = from_states([TippyGameState('p1', 2, [[0, -1], [1, 0]])])
+        >>> batch.legal_moves().astype(int).tolist()
+        [[1, 0, 0, 1]]
+        """
+
+        cells = numpy.arange(self.n * self.n, dtype=numpy.uint64)
+        legal = (self.free_cells()[:, None] >> cells) & numpy.uint64(1)
+        return legal.astype(bool) & ~self.over[:, None]
+
+    def is_legal(self, cells):
+        """ (TippyBatch, array of int) -> numpy.ndarray
+
+        Return bools: whether each board's cell in cells is a legal move.
+        A cell of -1 is never legal.
+        """
+
+        cells = numpy.asarray(cells)
+        bits = cell_bits(cells)
+        return (cells >= 0) & ~self.over & ((self.free_cells() & bits) != 0)
+
+    def apply_move(self, cells):
+        """ (TippyBatch, array of int) -> TippyBatch
+
+        Return the new TippyBatch reached by placing the next player's
+        piece at each board's cell in cells. Boards whose cell is -1 are
+        unchanged.
+
+        Precondition: each cell other than -1 is a legal move
+
+        >>> batch = from_states([TippyGameState('p1', 3),
+        ...                      TippyGameState('p2', 3)])
+        >>> batch = batch.apply_move([4, -1])
+        >>> [state.grid for state in batch.to_states()]
+        [[[0, 0, 0], [0, -1, 0], [0, 0, 0]], [[0, 0, 0], [0, 0, 0], [0, 0, 0]]]
+        >>> batch.p2_next.tolist()
+        [True, True]
+        """
+
+        cells = numpy.asarray(cells)
+        moved = cells >= 0
+        bits = cell_bits(cells)
+        new_batch = TippyBatch.__new__(TippyBatch)
+        new_batch.n = self.n
+        p1_moves, p2_moves = moved & ~self.p2_next, moved & self.p2_next
+        new_batch.p1_bits = self.p1_bits | numpy.where(p1_moves, bits, 0)
+        new_batch.p2_bits = self.p2_bits | numpy.where(p2_moves, bits, 0)
+        new_batch.p2_next = self.p2_next ^ moved
+        # Only the player who moved can have completed a tippy.
+        new_batch.p1_tippy = self.p1_tippy | (
+            p1_moves & has_tippy(new_batch.p1_bits, self.n))
+        new_batch.p2_tippy = self.p2_tippy | (
+            p2_moves & has_tippy(new_batch.p2_bits, self.n))
+        new_batch.over = (new_batch.p1_tippy | new_batch.p2_tippy |
+                          (new_batch.free_cells() == 0))
+        return new_batch
+
+    def outcomes(self):
+        """ (TippyBatch) -> numpy.ndarray
+
+        Return the outcome of each board for its next player, as a float:
+        WIN, LOSE, or DRAW if neither player has won.
+        """
+
+        next_tippy = numpy.where(self.p2_next, self.p2_tippy, self.p1_tippy)
+        other_tippy = numpy.where(self.p2_next, self.p1_tippy, self.p2_tippy)
+        return numpy.where(next_tippy, WIN,
+                           numpy.where(other_tippy, LOSE, DRAW))
+
+    def random_moves(self, rng):
+        """ (TippyBatch, numpy.random.Generator) -> numpy.ndarray
+
+        Return a cell chosen uniformly by rng from the legal moves of each
+        board, or -1 for boards whose game is over.
+
+        Each board draws a rank below its number of empty cells, and the
+        empty cell of that rank is found by binary search on the bitboard:
+        the rank is compared with the number of empty cells in the lower
+        half of the remaining bits, which then moves up or stays.
+
+        >>> batch = from_states([TippyGameState('p1', 2, [[0, -1], [1, 0]])]
+        ...                     * 1000)
+        >>> numpy.bincount(batch.random_moves(numpy.random.default_rng(0)),
+        ...                minlength=4).tolist()
+        [473, 0, 0, 527]
+        """
+
+        free = self.free_cells()
+        ranks = (rng.random(len(self)) *
+                 numpy.bitwise_count(free)).astype(numpy.uint64)
+        cells = numpy.zeros(len(self), dtype=numpy.uint64)
+        for width in (32, 16, 8, 4, 2, 1):
+            lower = numpy.bitwise_count(
+                (free >> cells) & numpy.uint64((1 << width) - 1)
+            ).astype(numpy.uint64)
+            above = ranks >= lower
+            ranks -= numpy.where(above, lower, numpy.uint64(0))
+            cells += numpy.where(above, numpy.uint64(width), numpy.uint64(0))
+        return numpy.where(self.over, -1, cells.astype(numpy.int64))
+
+    def random_playouts(self, rng):
+        """ (TippyBatch, numpy.random.Generator) -> numpy.ndarray
+
+        Return the outcome of each board for its next player once every
+        game is played on to its end with random moves chosen by rng.
+
+        >>> batch = from_states([TippyGameState('p1', 4)] * 1000)
+        >>> outcomes = batch.random_playouts(numpy.random.default_rng(0))
+        >>> sorted(set(outcomes.tolist())) == [LOSE, DRAW, WIN]
+        True
+        >>> last = TippyGameState('p2', 2, [[-1, 1], [-1, 0]])
+        >>> from_states([last]).random_playouts(numpy.random.default_rng(0)
+        ...                                      ).tolist()
+        [0.0]
+        """
+
+        batch = self
+        while not batch.over.all():
+            batch = batch.apply_move(batch.random_moves(rng))
+        outcomes = batch.outcomes()
+        # Flip the outcomes of boards that finished on the other player,
+        # adding 0.0 to turn the -0.0 of flipped draws into 0.0.
+        return numpy.where(batch.p2_next == self.p2_next, outcomes,
+                           -outcomes) + 0.0
+
+    def state(self, index):
+        """ (TippyBatch, int) -> TippyGameState
+
+        Return board number index of self as a TippyGameState.
+        """
+
+        return TippyGameState('p2' if self.p2_next[index] else 'p1', self.n,
+                              bits=(int(self.p1_bits[index]),
+                                    int(self.p2_bits[index])))
+
+    def to_states(self):
+        """ (TippyBatch) -> list of TippyGameState
+
+        Return self's boards as TippyGameStates.
+
+        >>> state = TippyGameState('p2', 3, [[-1, 0, 1], [0, -1, 0], [0, 0, 0]])
+        >>> from_states([state]).to_states() == [state]
+        True
+        """
+
+        return [self.state(index) for index in range(len(self))]
+
+
+def from_states(states):
+    """ (list of TippyGameState) -> TippyBatch
+
+    Return a TippyBatch of the boards of states, which share a sidelength.
+    """
+
+    n = states[0].n
+    if any(state.n != n for state in states):
+        raise ValueError('TippyBatch boards share a sidelength')
+    return TippyBatch(n, [state.p1_bits for state in states],
+                      [state.p2_bits for state in states],
+                      [state.next_player == 'p2' for state in states])
+
+
+def full_board(n):
+    """ (int) -> numpy.uint64
+
+    Return the bitboard of every cell of a board of sidelength n.
+    """
+
+    return numpy.uint64((1 << n * n) - 1)
+
+
+def cell_bits(cells):
+    """ (array of int) -> numpy.ndarray
+
+    Return the uint64 bitboard of each cell in cells, or 0 for a cell of -1.
+
+    >>> cell_bits([0, 3, -1]).tolist()
+    [1, 8, 0]
+    """
+
+    cells = numpy.asarray(cells)
+    bits = numpy.left_shift(numpy.uint64(1),
+                            numpy.maximum(cells, 0).astype(numpy.uint64))
+    return numpy.where(cells >= 0, bits, numpy.uint64(0))
+
+
+def has_tippy(bits, n):
+    """ (array of int, int) -> numpy.ndarray
+
+    Return bools: whether each uint64 bitboard in bits of a board of
+    sidelength n contains a tippy. This is has_tippy from tippy_game_state,
+    run on every bitboard at once.
+
+    >>> has_tippy(numpy.array([0b000011011, 0b000011110], numpy.uint64), 3
+    ...           ).tolist()
+    [False, True]
+    """
+
+    found_any = numpy.zeros(numpy.shape(bits), dtype=bool)
+    for anchors, shifts in shift_table(n):
+        found = numpy.full(numpy.shape(bits), anchors, dtype=numpy.uint64)
+        for shift in shifts:
+            found &= bits >> numpy.uint64(shift)
+        found_any |= found != 0
+    return found_any
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -1,16 +1,48 @@
 from game_state import GameState
 from tippy_move import TippyMove
-from random import randint
+from random import randint, Random, shuffle
+
+# The four distinct tippy shapes as (row, column) offsets from the top-left
+# corner of their bounding box. These are the shapes found by the
+# horizontal and vertical checks in is_tippy, in every direction.
+TIPPY_SHAPES = (((0, 0), (1, 0), (1, 1), (2, 1)),
+                ((0, 1), (1, 1), (1, 0), (2, 0)),
+                ((0, 0), (0, 1), (1, 1), (1, 2)),
+                ((1, 0), (1, 1), (0, 1), (0, 2)))
+
+# Move, shift, pattern, Zobrist and symmetry tables for each board size,
+# built on first use by move_table, shift_table, tippy_patterns,
+# zobrist_table and symmetry_table.
+_MOVE_TABLES = {}
+_SHIFT_TABLES = {}
+_PATTERN_TABLES = {}
+_ZOBRIST_TABLES = {}
+_SYMMETRY_TABLES = {}
+
 
 class TippyGameState(GameState):
     """ The state of a Tippy game.
+
+    The board is stored as bitboards: cell (x, y) is bit x * n + y.
+
+    n: int          -- sidelength of the board
+    p1_bits: int    -- bitboard of the cells holding p1's pieces (x)
+    p2_bits: int    -- bitboard of the cells holding p2's pieces (o)
+    occupied: int   -- bitboard of all cells holding a piece
+    p1_tippy: bool  -- whether p1's pieces contain a tippy
+    p2_tippy: bool  -- whether p2's pieces contain a tippy
+    zobrist: int    -- 64-bit Zobrist hash of the board and next player
     """
+    SUPPORTS_PUSH = True
 
-    def __init__(self, p, n, grid = None, interactive = False):
-        """ (TippyGameState, str, int, list of list of int, bool) -> NoneType
+    def __init__(self, p, n, grid = None, interactive = False, bits = None):
+        """ (TippyGameState, str, int, list of list of int, bool,
+             tuple of (int, int)) -> NoneType
 
         Initialize TippyGameState self with player p and a grid. If no grid is
-        provided, initialize an empty grid of sidelength n.
+        provided, initialize an empty grid of sidelength n. If bits is
+        provided, it is the pair (p1_bits, p2_bits) and takes the place of
+        grid.
         """
         GameState.__init__(self, p)
         self.instructions = ('Players take turns placing an x or an o on the '
@@ -19,19 +51,70 @@ class TippyGameState(GameState):
         if interactive:
             n = int(input('Sidelength of the board?'))
 
-        # Initialize the empty grid if one is not passed on.
-        if not grid:
-            row = []
-            self.grid = []
-            for i in range(n):
-                row += [0]
-            for i in range(n):
-                self.grid.append(row[:])
-        else:
+        if grid and not bits:
             self.grid = grid
+        else:
+            # Initialize the empty grid if one is not passed on.
+            self.n = n
+            self.p1_bits, self.p2_bits = bits or (0, 0)
+            self.occupied = self.p1_bits | self.p2_bits
+            self.p1_tippy = has_tippy(self.p1_bits, n)
+            self.p2_tippy = has_tippy(self.p2_bits, n)
+            self.zobrist = zobrist_hash(self.p1_bits, self.p2_bits, n, p)
+            self._symmetric = None
+        # Undo records for pop_move: (move, mover's tippy flag, over).
+        self._undo = []
 
         self.over = (self.winner(self.opponent()) or
-                     self.possible_next_moves() == [])
+                     self.occupied == (1 << self.n * self.n) - 1)
+
+    @property
+    def grid(self):
+        """ (TippyGameState) -> list of list of int
+
+        Return the board as a list of rows, with -1 for p1's pieces, 1 for
+        p2's pieces and 0 for empty cells. The list is a fresh view:
+        changing it does not change self.
+
+        >>> t = TippyGameState('p1', 2, [[0, -1], [1, 0]])
+        >>> t.grid
+        [[0, -1], [1, 0]]
+        """
+
+        grid = []
+        bit = 1
+        for x in range(self.n):
+            row = []
+            for y in range(self.n):
+                if self.p1_bits & bit:
+                    row.append(-1)
+                elif self.p2_bits & bit:
+                    row.append(1)
+                else:
+                    row.append(0)
+                bit <<= 1
+            grid.append(row)
+        return grid
+
+    @grid.setter
+    def grid(self, grid):
+        """ (TippyGameState, list of list of int) -> NoneType
+
+        Replace the board of self with grid.
+        """
+
+        self.n = len(grid)
+        self.p1_bits = grid_bits(grid, -1)
+        self.p2_bits = grid_bits(grid, 1)
+        self.occupied = self.p1_bits | self.p2_bits
+        self.p1_tippy = has_tippy(self.p1_bits, self.n)
+        self.p2_tippy = has_tippy(self.p2_bits, self.n)
+        self.zobrist = zobrist_hash(self.p1_bits, self.p2_bits, self.n,
+                                    self.next_player)
+        # The board under every symmetry, as built by symmetric_bits. Built
+        # by the first call to canonical, then kept up to date by push_move
+        # and pop_move.
+        self._symmetric = None
 
     def __repr__(self):
         """ (TippyGameState) -> str
@@ -46,7 +129,7 @@ class TippyGameState(GameState):
         """
 
         return "TippyGameState({}, {}, {})".format(repr(self.next_player),
-                                                   repr(len(self.grid)),
+                                                   repr(self.n),
                                                    repr(self.grid))
 
     def __str__(self):
@@ -67,16 +150,17 @@ class TippyGameState(GameState):
         """
 
         grid_str = " "
+        grid = self.grid
 
         # Draw the y-axis.
-        for i in range(len(self.grid)):
+        for i in range(len(grid)):
             grid_str += ' ' + str(i)
         grid_str += ' (y)\n'
 
         # Draw the grid and the x-axis.
-        for i in range(len(self.grid)):
+        for i in range(len(grid)):
             grid_str += str(i) + '['
-            for element in self.grid[i]:
+            for element in grid[i]:
                 if element == -1:
                     grid_str += 'x'
                 elif element == 1:
@@ -109,7 +193,107 @@ class TippyGameState(GameState):
 
         return (isinstance(other, TippyGameState) and
                 self.next_player == other.next_player and
-                self.grid == other.grid)
+                self.n == other.n and
+                self.p1_bits == other.p1_bits and
+                self.p2_bits == other.p2_bits)
+
+    def __hash__(self):
+        """ (TippyGameState) -> int
+
+        Return a hash of TippyGameState self, consistent with __eq__.
+
+        >>> hash(TippyGameState('p1', 3)) == hash(TippyGameState('p1', 3))
+        True
+        """
+
+        return hash(self.zobrist)
+
+    def key(self):
+        """ (TippyGameState) -> int
+
+        Return the Zobrist hash of self, a compact key for self. Different
+        states share a key with probability about 2 ** -64 per pair.
+
+        >>> t = TippyGameState('p1', 3)
+        >>> t.key() == t.apply_move(TippyMove(0, 0)).key()
+        False
+        """
+
+        return self.zobrist
+
+    def __reduce__(self):
+        """ (TippyGameState) -> tuple
+
+        Return how to pickle TippyGameState self: by its player, size and
+        bitboards. The undo records of push_move are not kept.
+
+        >>> import pickle
+        >>> t = TippyGameState('p1', 3).apply_move(TippyMove(0, 0))
+        >>> pickle.loads(pickle.dumps(t)) == t
+        True
+        """
+
+        return (TippyGameState, (self.next_player, self.n, None, False,
+                                 (self.p1_bits, self.p2_bits)))
+
+    def canonical(self):
+        """ (TippyGameState) -> tuple of (int, int)
+
+        Return (key, transform) for the least of the eight rotations and
+        reflections of self; transform is the index of that symmetry in
+        symmetry_table(self.n). The key packs the board, the next player
+        and n, so it is exact and the same in every process.
+
+        >>> a = TippyGameState('p1', 3, [[-1, 0, 0], [0, 0, 0], [0, 0, 0]])
+        >>> b = TippyGameState('p1', 3, [[0, 0, 0], [0, 0, 0], [0, 0, -1]])
+        >>> a.canonical()[0] == b.canonical()[0]
+        True
+        >>> a.canonical()[0] == TippyGameState('p1', 3).canonical()[0]
+        False
+        """
+
+        if self._symmetric is None:
+            self._symmetric = symmetric_bits(self.p1_bits, self.p2_bits,
+                                             self.n)
+        width = 2 * self.n * self.n
+        mask = (1 << width) - 1
+        boards = [self._symmetric >> shift & mask
+                  for shift in range(0, 8 * width, width)]
+        best = min(boards)
+        # Keep the board in the low bits, where dict hashing looks first.
+        if self.next_player == 'p2':
+            high = self.n << 1 | 1
+        else:
+            high = self.n << 1
+        return high << width | best, boards.index(best)
+
+    def transform_move(self, move, transform):
+        """ (TippyGameState, TippyMove, int) -> TippyMove
+
+        Return the move that move becomes under symmetry transform.
+
+        >>> t = TippyGameState('p1', 3, [[0, 0, 0], [0, 0, 0], [0, 0, -1]])
+        >>> key, transform = t.canonical()
+        >>> t.transform_move(TippyMove(2, 2), transform)
+        TippyMove(0, 0)
+        """
+
+        cell = symmetry_table(self.n)[0][transform][move.x * self.n + move.y]
+        return move_table(self.n)[cell]
+
+    def untransform_move(self, move, transform):
+        """ (TippyGameState, TippyMove, int) -> TippyMove
+
+        Return the move that symmetry transform maps onto move.
+
+        >>> t = TippyGameState('p1', 3, [[0, 0, 0], [0, 0, 0], [0, 0, -1]])
+        >>> key, transform = t.canonical()
+        >>> t.untransform_move(TippyMove(0, 0), transform)
+        TippyMove(2, 2)
+        """
+
+        cell = symmetry_table(self.n)[1][transform][move.x * self.n + move.y]
+        return move_table(self.n)[cell]
 
     def get_move(self):
         """ (TippyGameState) -> TippyMove
@@ -124,36 +308,148 @@ class TippyGameState(GameState):
     def apply_move(self, move):
         """ (TippyGameState, TippyMove) -> TippyGameState
 
-        Return the new TippyGameState by applying move to self.
+        Return the new TippyGameState by applying move to self, or None if
+        move is illegal.
+
+        >>> t = TippyGameState('p1', 3).apply_move(TippyMove(0, 1))
+        >>> t.grid
+        [[0, -1, 0], [0, 0, 0], [0, 0, 0]]
+        >>> t.apply_move(TippyMove(0, 1)) is None
+        True
+        """
+
+        if self.is_legal(move):
+            # Copy self without its undo records, then place the piece.
+            new_state = TippyGameState.__new__(TippyGameState)
+            new_state.__dict__.update(self.__dict__)
+            new_state._undo = []
+            new_state.push_move(move)
+            return new_state
+        return None
+
+    def is_legal(self, move):
+        """ (TippyGameState, TippyMove) -> bool
+
+        Return whether move places a piece on an empty cell of self.
+
+        >>> t = TippyGameState('p1', 2, [[0, -1], [1, 0]])
+        >>> t.is_legal(TippyMove(0, 0)), t.is_legal(TippyMove(0, 1))
+        (True, False)
+        >>> t.is_legal(TippyMove(2, 0))
+        False
+        """
+
+        return (isinstance(move, TippyMove) and 0 <= move.x < self.n and
+                0 <= move.y < self.n and
+                not self.occupied >> (move.x * self.n + move.y) & 1)
+
+    def push_move(self, move):
+        """ (TippyGameState, TippyMove) -> NoneType
+
+        Place the next player's piece at move on self in place.
+
+        >>> t = TippyGameState('p1', 3)
+        >>> t.push_move(TippyMove(1, 1))
+        >>> t.grid, t.next_player
+        ([[0, 0, 0], [0, -1, 0], [0, 0, 0]], 'p2')
+        >>> t.pop_move()
+        TippyMove(1, 1)
+        >>> t == TippyGameState('p1', 3)
+        True
+        """
+
+        cell = move.x * self.n + move.y
+        bit = 1 << cell
+        p1_keys, p2_keys, p2_key = zobrist_table(self.n)
+        self.occupied |= bit
+        if self.next_player == 'p1':
+            self._undo.append((move, self.p1_tippy, self.over))
+            if self._symmetric is not None:
+                self._symmetric |= symmetry_table(self.n)[2][cell]
+            self.p1_bits |= bit
+            self.zobrist ^= p1_keys[cell] ^ p2_key
+            if not self.p1_tippy:
+                self.p1_tippy = completes_tippy(self.p1_bits, cell, self.n)
+            self.over = (self.p1_tippy or
+                         self.occupied == (1 << self.n * self.n) - 1)
+            self.next_player = 'p2'
+        else:
+            self._undo.append((move, self.p2_tippy, self.over))
+            if self._symmetric is not None:
+                self._symmetric |= symmetry_table(self.n)[3][cell]
+            self.p2_bits |= bit
+            self.zobrist ^= p2_keys[cell] ^ p2_key
+            if not self.p2_tippy:
+                self.p2_tippy = completes_tippy(self.p2_bits, cell, self.n)
+            self.over = (self.p2_tippy or
+                         self.occupied == (1 << self.n * self.n) - 1)
+            self.next_player = 'p1'
+
+    def pop_move(self):
+        """ (TippyGameState) -> TippyMove
+
+        Remove the piece placed by the most recent push_move on self and
+        return its move.
         """
 
-        if move in self.possible_next_moves():
-            # Update the grid.
-            new_grid = []
-            for i in range(len(self.grid)):
-                new_grid.append(self.grid[i][:])
-            if self.next_player == 'p1':
-                new_grid[move.x][move.y] = -1
-            else:
-                new_grid[move.x][move.y] = 1
-            return TippyGameState(self.opponent(), len(self.grid), new_grid)
+        move, tippy, self.over = self._undo.pop()
+        cell = move.x * self.n + move.y
+        bit = 1 << cell
+        p1_keys, p2_keys, p2_key = zobrist_table(self.n)
+        self.occupied ^= bit
+        if self.next_player == 'p2':
+            if self._symmetric is not None:
+                self._symmetric ^= symmetry_table(self.n)[2][cell]
+            self.p1_bits ^= bit
+            self.zobrist ^= p1_keys[cell] ^ p2_key
+            self.p1_tippy = tippy
+            self.next_player = 'p1'
         else:
-            return None
+            if self._symmetric is not None:
+                self._symmetric ^= symmetry_table(self.n)[3][cell]
+            self.p2_bits ^= bit
+            self.zobrist ^= p2_keys[cell] ^ p2_key
+            self.p2_tippy = tippy
+            self.next_player = 'p2'
+        return move
 
     def possible_next_moves(self):
         """ (TippyGameState) -> list of TippyMove
 
         Return a possibly empty list of moves that are legal from the present
         state.
+
+        >>> TippyGameState('p1', 2, [[0, -1], [1, 0]]).possible_next_moves()
+        [TippyMove(0, 0), TippyMove(1, 1)]
         """
 
         legal_moves = []
-        for x in range(len(self.grid)):
-            for y in range(len(self.grid[x])):
-                if self.grid[x][y] == 0:
-                    legal_moves.append(TippyMove(x, y))
+        moves = move_table(self.n)
+        free = ((1 << self.n * self.n) - 1) & ~self.occupied
+        while free:
+            # Take the empty cells in row-major order, lowest bit first.
+            low = free & -free
+            legal_moves.append(moves[low.bit_length() - 1])
+            free ^= low
         return legal_moves
 
+    def iter_next_moves(self):
+        """ (TippyGameState) -> iterator of TippyMove
+
+        Generate the moves possible_next_moves returns, in the same order.
+
+        >>> t = TippyGameState('p1', 2, [[0, -1], [1, 0]])
+        >>> next(t.iter_next_moves())
+        TippyMove(0, 0)
+        """
+
+        moves = move_table(self.n)
+        free = ((1 << self.n * self.n) - 1) & ~self.occupied
+        while free:
+            low = free & -free
+            yield moves[low.bit_length() - 1]
+            free ^= low
+
     def winner(self, player):
         """ (TippyGameState, str) -> bool
 
@@ -162,79 +458,392 @@ class TippyGameState(GameState):
         Precondition: player is either 'p1' or 'p2'
         """
         if player == 'p1':
-            return is_tippy(self.grid, -1)
-        return is_tippy(self.grid, 1)
+            return self.p1_tippy
+        return self.p2_tippy
 
     def rough_outcome(self):
         """ (TippyGameState) -> float
 
         Return an estimate in interval [LOSE, WIN] of best outcome next_player
-        can guarantee from state self.
-        """
-
-        for move in self.possible_next_moves():
-            # Check to see if the next player can win in a single move.
-            if self.next_player == 'p1':
-                self.grid[move.x][move.y] = -1
-            else:
-                self.grid[move.x][move.y] = 1
-            if self.winner(self.next_player):
-                # Undo the move.
-                self.grid[move.x][move.y] = 0
-                return TippyGameState.WIN
-
-            # Check to see if the opponent can win in a single move.
-            if self.next_player == 'p1':
-                self.grid[move.x][move.y] = 1
-            else:
-                self.grid[move.x][move.y] = -1
-            if self.winner(self.opponent()):
-                # Undo the move.
-                self.grid[move.x][move.y] = 0
-                return TippyGameState.LOSE
-            self.grid[move.x][move.y] = 0
-        return TippyGameState.DRAW
+        can guarantee from state self: WIN if next_player can complete a
+        tippy now, LOSE if the opponent can complete tippies on two cells
+        and only one can be blocked, and otherwise a score strictly between
+        them from the tippies each player can still complete, counting the
+        opponent's single threat, which must be blocked, against
+        next_player.
+
+        >>> TippyGameState('p1', 3, [[-1, 0, 0], [-1, -1, 0], [0, 0, 0]]
+        ...                ).rough_outcome()
+        1.0
+        >>> TippyGameState('p2', 3, [[1, -1, 0], [-1, -1, 0], [0, 1, 1]]
+        ...                ).rough_outcome()
+        -1.0
+        >>> TippyGameState('p2', 3, [[1, 1, 1], [0, -1, -1], [1, -1, -1]]
+        ...                ).rough_outcome()
+        -0.75
+        >>> TippyGameState('p1', 3).rough_outcome()
+        0.0
+        """
 
-def is_tippy(grid, player):
-    """ (list of list of int) -> bool
+        if self.next_player == 'p1':
+            mine, theirs = self.p1_bits, self.p2_bits
+            mine_won, theirs_won = self.p1_tippy, self.p2_tippy
+        else:
+            mine, theirs = self.p2_bits, self.p1_bits
+            mine_won, theirs_won = self.p2_tippy, self.p1_tippy
+        if mine_won:
+            return TippyGameState.WIN
+        if theirs_won:
+            return TippyGameState.LOSE
+        free = ((1 << self.n * self.n) - 1) & ~self.occupied
+        if threat_cells(mine, free, self.n):
+            return TippyGameState.WIN
+        threats = threat_cells(theirs, free, self.n).bit_count()
+        if threats >= 2:
+            return TippyGameState.LOSE
+        mine_live = live_patterns(mine | free, self.n)
+        theirs_live = live_patterns(theirs | free, self.n) + 2 * threats
+        return (mine_live - theirs_live) / (mine_live + theirs_live + 1)
+
+    def random_playout(self):
+        """ (TippyGameState) -> float
 
-    Return true iff a tippy is on the board placed by player.
+        Return the outcome for next_player of the game played on from self
+        with random moves until it is over. self is left unchanged. A move
+        never makes another legal, so the game is played as a random order
+        of the empty cells.
+
+        >>> t = TippyGameState('p1', 3, [[-1, 1, -1], [1, 0, 1], [1, -1, 1]])
+        >>> t.random_playout()
+        0.0
+        """
+
+        player, opponent = self.next_player, self.opponent()
+        moves = self.possible_next_moves()
+        shuffle(moves)
+        pushed = 0
+        for move in moves:
+            if self.over:
+                break
+            self.push_move(move)
+            pushed += 1
+        if self.winner(player):
+            outcome = TippyGameState.WIN
+        elif self.winner(opponent):
+            outcome = TippyGameState.LOSE
+        else:
+            outcome = TippyGameState.DRAW
+        for _ in range(pushed):
+            self.pop_move()
+        return outcome
+
+
+def move_table(n):
+    """ (int) -> list of TippyMove
+
+    Return the move for each cell of a board of sidelength n, shared by
+    every state of that size. Tables are built once per n.
+
+    >>> move_table(3)[5]
+    TippyMove(1, 2)
+    >>> move_table(3)[5] is move_table(3)[5]
+    True
+    """
+
+    if n not in _MOVE_TABLES:
+        _MOVE_TABLES[n] = [TippyMove(x, y) for x in range(n) for y in range(n)]
+    return _MOVE_TABLES[n]
+
+
+def shift_table(n):
+    """ (int) -> list of tuple of (int, tuple of int)
+
+    Return, for each tippy shape that fits on a board of sidelength n, the
+    bitboard of cells where the shape can be anchored and the bit shifts
+    of its four cells from the anchor. Tables are built once per n.
+
+    >>> shift_table(3)
+    [(3, (0, 3, 4, 7)), (3, (1, 4, 3, 6)), (9, (0, 1, 4, 5)), (9, (3, 4, 1, 2))]
+    """
+
+    if n not in _SHIFT_TABLES:
+        table = []
+        for shape in TIPPY_SHAPES:
+            height = max(dx for dx, dy in shape) + 1
+            width = max(dy for dx, dy in shape) + 1
+            anchors = 0
+            for x in range(n - height + 1):
+                for y in range(n - width + 1):
+                    anchors |= 1 << (x * n + y)
+            if anchors:
+                table.append((anchors, tuple(dx * n + dy for dx, dy in shape)))
+        _SHIFT_TABLES[n] = table
+    return _SHIFT_TABLES[n]
+
+
+def tippy_patterns(n):
+    """ (int) -> tuple of (tuple of int, list of tuple of int)
+
+    Return every placement of a tippy on a board of sidelength n as a
+    bitboard, together with a list indexed by cell of the placements that
+    cover that cell. Tables are built once per n.
+
+    >>> patterns, by_cell = tippy_patterns(3)
+    >>> len(patterns)
+    8
+    >>> by_cell[0]
+    (153, 51)
+    """
+
+    if n not in _PATTERN_TABLES:
+        patterns = []
+        for anchors, shifts in shift_table(n):
+            while anchors:
+                low = anchors & -anchors
+                pattern = 0
+                for shift in shifts:
+                    pattern |= low << shift
+                patterns.append(pattern)
+                anchors ^= low
+        by_cell = [tuple(pattern for pattern in patterns
+                         if pattern >> cell & 1)
+                   for cell in range(n * n)]
+        _PATTERN_TABLES[n] = (tuple(patterns), by_cell)
+    return _PATTERN_TABLES[n]
+
+
+def completes_tippy(bits, cell, n):
+    """ (int, int, int) -> bool
+
+    Return True iff the bitboard bits of a board of sidelength n contains a
+    tippy that covers cell.
+
+    >>> completes_tippy(0b010011001, 7, 3)
+    True
+    >>> completes_tippy(0b010011001, 8, 3)
+    False
     """
 
-    # Go through the grid and check each square.
-    for x in range(len(grid)):
-        for y in range(len(grid[x])):
-
-            # Check for tippys in every possible direction.
-            for dx in range(-1, 2, 2):
-                for dy in range(-1, 2, 2):
-
-                    # Find horizontal tippys
-                    if (abs(look(grid, x, y, player)
-                        + look(grid, x + dx, y, player)
-                        + look(grid, x + dx, y + dy, player)
-                        + look(grid, x + 2 * dx, y + dy, player)) == 4):
-                        return True
-                    # Find vertical tippys
-                    if (abs(look(grid, x, y, player)
-                        + look(grid, x, y + dy, player)
-                        + look(grid, x + dx, y + dy, player)
-                        + look(grid, x + dx, y + 2 * dy, player)) == 4):
-                        return True
+    for pattern in tippy_patterns(n)[1][cell]:
+        if bits & pattern == pattern:
+            return True
     return False
 
-def look(grid, x, y, player):
-    """ (list of list of int, int, int, int, int, int) -> int
 
-    Helper function for the function is_tippy. Return an int value for
+def has_tippy(bits, n):
+    """ (int, int) -> bool
+
+    Return True iff the bitboard bits of a board of sidelength n contains a
+    tippy.
+
+    >>> has_tippy(0b000011011, 3)
+    False
+    >>> has_tippy(0b000011110, 3)
+    True
+    """
+
+    for anchors, shifts in shift_table(n):
+        # Keep the anchors whose shifted cells are all set.
+        found = anchors
+        for shift in shifts:
+            found &= bits >> shift
+        if found:
+            return True
+    return False
+
+
+def threat_cells(bits, free, n):
+    """ (int, int, int) -> int
+
+    Return the bitboard of the cells in free that would complete a tippy
+    with the bitboard bits of a board of sidelength n.
+
+    >>> bin(threat_cells(0b000010011, 0b111101100, 3))
+    '0b100000'
+    """
+
+    threats = 0
+    for anchors, shifts in shift_table(n):
+        for missing in shifts:
+            # Keep the anchors whose missing cell is free and whose other
+            # three cells are set.
+            found = anchors & (free >> missing)
+            for shift in shifts:
+                if shift != missing:
+                    found &= bits >> shift
+            threats |= found << missing
+    return threats
+
+
+def live_patterns(bits, n):
+    """ (int, int) -> int
+
+    Return the number of placements of a tippy on a board of sidelength n
+    that lie entirely within the bitboard bits.
+
+    >>> live_patterns(0b111111111, 3)
+    8
+    >>> live_patterns(0b111101111, 3)
+    0
+    """
+
+    count = 0
+    for anchors, shifts in shift_table(n):
+        found = anchors
+        for shift in shifts:
+            found &= bits >> shift
+        count += found.bit_count()
+    return count
+
+
+def zobrist_table(n):
+    """ (int) -> tuple of (list of int, list of int, int)
+
+    Return the Zobrist keys for a board of sidelength n: one random 64-bit
+    key per cell for p1's pieces, one per cell for p2's pieces, and one for
+    p2 being the next player. The keys are seeded by n, so they are the same
+    in every process.
+
+    >>> p1_keys, p2_keys, p2_key = zobrist_table(3)
+    >>> len(p1_keys), len(p2_keys)
+    (9, 9)
+    >>> zobrist_table(3)[2] == p2_key
+    True
+    """
+
+    if n not in _ZOBRIST_TABLES:
+        rng = Random(n)
+        p1_keys = [rng.getrandbits(64) for cell in range(n * n)]
+        p2_keys = [rng.getrandbits(64) for cell in range(n * n)]
+        _ZOBRIST_TABLES[n] = (p1_keys, p2_keys, rng.getrandbits(64))
+    return _ZOBRIST_TABLES[n]
+
+
+def zobrist_hash(p1_bits, p2_bits, n, player):
+    """ (int, int, int, str) -> int
+
+    Return the Zobrist hash of a board of sidelength n with bitboards
+    p1_bits and p2_bits and next player player.
+
+    >>> zobrist_hash(0, 0, 3, 'p1')
+    0
+    >>> zobrist_hash(0, 0, 3, 'p2') == zobrist_table(3)[2]
+    True
+    """
+
+    p1_keys, p2_keys, p2_key = zobrist_table(n)
+    h = p2_key if player == 'p2' else 0
+    for keys, bits in ((p1_keys, p1_bits), (p2_keys, p2_bits)):
+        while bits:
+            low = bits & -bits
+            h ^= keys[low.bit_length() - 1]
+            bits ^= low
+    return h
+
+
+def symmetry_table(n):
+    """ (int) -> tuple of (list of list of int, list of list of int,
+                           list of int, list of int)
+
+    Return the eight symmetries of a board of sidelength n (rotations and
+    reflections), built once per n: for each symmetry, the cell each cell
+    is sent to and the cell each cell comes from; and for each cell, the
+    bits it sets in symmetric_bits when it holds a piece of p1, and when it
+    holds a piece of p2. Symmetry 0 is the identity. Tippies are sent to
+    tippies by every symmetry.
+
+    >>> perms, inverses, p1_masks, p2_masks = symmetry_table(3)
+    >>> perms[0]
+    [0, 1, 2, 3, 4, 5, 6, 7, 8]
+    >>> sorted(perms[5]) == list(range(9))
+    True
+    """
+
+    if n not in _SYMMETRY_TABLES:
+        perms, inverses = [], []
+        for transpose in (False, True):
+            for flip_x in (False, True):
+                for flip_y in (False, True):
+                    perm = []
+                    for x in range(n):
+                        for y in range(n):
+                            new_x = n - 1 - x if flip_x else x
+                            new_y = n - 1 - y if flip_y else y
+                            if transpose:
+                                new_x, new_y = new_y, new_x
+                            perm.append(new_x * n + new_y)
+                    inverse = [0] * (n * n)
+                    for cell in range(n * n):
+                        inverse[perm[cell]] = cell
+                    perms.append(perm)
+                    inverses.append(inverse)
+        width = 2 * n * n
+        p1_masks, p2_masks = [], []
+        for cell in range(n * n):
+            p1_mask, p2_mask = 0, 0
+            for transform in range(8):
+                p2_bit = 1 << (transform * width + perms[transform][cell])
+                p1_mask |= p2_bit << (n * n)
+                p2_mask |= p2_bit
+            p1_masks.append(p1_mask)
+            p2_masks.append(p2_mask)
+        _SYMMETRY_TABLES[n] = (perms, inverses, p1_masks, p2_masks)
+    return _SYMMETRY_TABLES[n]
+
+
+def symmetric_bits(p1_bits, p2_bits, n):
+    """ (int, int, int) -> int
+
+    Return the board of sidelength n with bitboards p1_bits and p2_bits
+    under each of the eight symmetries of symmetry_table(n), as one int.
+    Each symmetric board takes 2 * n * n bits, with p1's pieces above p2's,
+    and symmetry i is at bit 2 * n * n * i.
+
+    >>> bits = symmetric_bits(0, 1, 3)
+    >>> [bits >> (18 * i) & (2 ** 18 - 1) for i in range(8)]
+    [1, 4, 64, 256, 1, 64, 4, 256]
+    """
+
+    perms, inverses, p1_masks, p2_masks = symmetry_table(n)
+    symmetric = 0
+    for masks, bits in ((p1_masks, p1_bits), (p2_masks, p2_bits)):
+        while bits:
+            low = bits & -bits
+            symmetric |= masks[low.bit_length() - 1]
+            bits ^= low
+    return symmetric
+
+
+def grid_bits(grid, player):
+    """ (list of list of int, int) -> int
+
+    Return the bitboard of the cells in grid that hold player's pieces.
+
+    >>> grid_bits([[0, -1], [-1, 1]], -1)
+    6
+    """
+
+    bits = 0
+    n = len(grid)
+    for x in range(n):
+        for y in range(n):
+            if grid[x][y] == player:
+                bits |= 1 << (x * n + y)
+    return bits
+
+
+def is_tippy(grid, player):
+    """ (list of list of int) -> bool
+
+    Return true iff a tippy is on the board placed by player.
+
+    >>> is_tippy([[1, 0, 0], [1, 1, 0], [0, 1, 0]], 1)
+    True
+    >>> is_tippy([[1, 0, 0], [1, 1, 0], [0, 1, 0]], -1)
+    False
     """
 
-    # x and y are out of bounds
-    if x < 0 or x >= len(grid) or y < 0 or y >= len(grid):
-        return 0
-    if grid[x][y] != player:
-        return 0
-    return 1
+    return has_tippy(grid_bits(grid, player), len(grid))
 
 if __name__ == '__main__':
     import doctest
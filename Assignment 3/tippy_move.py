@@ -4,7 +4,13 @@ from move import Move
 class TippyMove(Move):
     """ A move in the game of Tippy.
 
+    TippyMoves are immutable: TippyGameState hands out one shared instance
+    per cell of each board size, from move_table.
+
+    x: int -- row of the cell to place a piece on
+    y: int -- column of the cell to place a piece on
     """
+    __slots__ = ('x', 'y')
 
     def __init__(self, x, y):
         """ (TippyMove, x, y) -> NoneType
@@ -56,6 +62,30 @@ class TippyMove(Move):
         return (isinstance(other, TippyMove) and self.x == other.x and
                 self.y == other.y)
 
+    def __hash__(self):
+        """ (TippyMove) -> int
+
+        Return a hash of TippyMove self, consistent with __eq__.
+
+        >>> hash(TippyMove(1, 2)) == hash(TippyMove(1, 2))
+        True
+        """
+
+        return hash((self.x, self.y))
+
+    def __reduce__(self):
+        """ (TippyMove) -> tuple
+
+        Return how to pickle TippyMove self: by its coordinates.
+
+        >>> import pickle
+        >>> pickle.loads(pickle.dumps(TippyMove(1, 2)))
+        TippyMove(1, 2)
+        """
+
+        return (TippyMove, (self.x, self.y))
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
\ No newline at end of file
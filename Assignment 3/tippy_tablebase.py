@@ -0,0 +1,201 @@
+from tippy_game_state import has_tippy
+from itertools import combinations
+from mmap import mmap, ACCESS_READ
+import os
+import struct
+
+# A tablebase file is a header followed by one byte per position: its value
+# for the player to move in the top two bits, and the cell of its best move
+# in the low six. Position (p1_bits, p2_bits, player) has index
+# 2 * rank + side, where rank is the board in base 3 (a cell of p1's counts
+# 1 and a cell of p2's counts 2 times 3 to the power of its bit) and side is
+# 0 if p1 is to move and 1 if p2 is.
+UNKNOWN, WIN, LOSE, DRAW = 0, 1, 2, 3
+
+# Header: magic, sidelength, and the fewest pieces of a solved layer; layers
+# are solved from the full board down, so the file is complete at 0.
+HEADER = struct.Struct('<8sHH')
+MAGIC = b'TIPPYTB1'
+
+
+def tablebase_index(p1_bits, p2_bits, n, player):
+    """ (int, int, int, str) -> int
+
+    Return the index in a tablebase of the position with bitboards p1_bits
+    and p2_bits on a board of sidelength n, and player to move.
+
+    >>> tablebase_index(0, 0, 3, 'p2')
+    1
+    >>> tablebase_index(0b10, 0b100, 3, 'p1')
+    42
+    """
+
+    rank, power = 0, 1
+    for cell in range(n * n):
+        if p1_bits >> cell & 1:
+            rank += power
+        elif p2_bits >> cell & 1:
+            rank += 2 * power
+        power *= 3
+    return 2 * rank + (player == 'p2')
+
+
+def build_tablebase(path, n):
+    """ (str, int) -> NoneType
+
+    Write the tablebase for boards of sidelength n to the file at path, by
+    retrograde analysis: layer by layer from the full board down, each
+    position is solved from the positions one move later. Every position
+    with piece counts that can arise in a game is solved; the others are
+    left UNKNOWN. The header is updated after each layer, so if path holds
+    a partly built tablebase for n, building resumes after its last solved
+    layer.
+
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'tippy_3.tb')
+    >>> build_tablebase(path, 3)
+    >>> read_header(path)
+    (3, 0)
+    """
+
+    size = HEADER.size + 2 * 3 ** (n * n)
+    if os.path.exists(path) and read_header(path)[0] == n:
+        solved = read_header(path)[1]
+    else:
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, n, n * n + 1))
+            f.truncate(size)
+        solved = n * n + 1
+    with open(path, 'r+b') as f:
+        table = mmap(f.fileno(), size)
+        try:
+            for pieces in range(solved - 1, -1, -1):
+                solve_layer(table, n, pieces)
+                # Write the layer out before recording that it is solved.
+                table.flush()
+                table[:HEADER.size] = HEADER.pack(MAGIC, n, pieces)
+                table.flush()
+        finally:
+            table.close()
+
+
+def read_header(path):
+    """ (str) -> tuple of (int, int)
+
+    Return the sidelength of the boards of the tablebase at path, and the
+    fewest pieces of a solved layer. Raise ValueError if path does not hold
+    a tablebase.
+    """
+
+    with open(path, 'rb') as f:
+        magic, n, solved = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError('{} is not a Tippy tablebase'.format(path))
+    return n, solved
+
+
+def solve_layer(table, n, pieces):
+    """ (mmap, int, int) -> NoneType
+
+    Solve each position of table, a tablebase for sidelength n, with the
+    given number of pieces on the board, from the solved positions with one
+    more piece. The best move is the first, in the order of
+    possible_next_moves, of those with the best value.
+    """
+
+    cells = n * n
+    powers = [3 ** cell for cell in range(cells)]
+    for occupied_cells in combinations(range(cells), pieces):
+        occupied = 0
+        occupied_rank = 0
+        for cell in occupied_cells:
+            occupied |= 1 << cell
+            occupied_rank += powers[cell]
+        free = [cell for cell in range(cells) if not occupied >> cell & 1]
+        # In a game p1 and p2 have equally many pieces or one more.
+        for p1_count in {pieces // 2, (pieces + 1) // 2}:
+            if p1_count * 2 == pieces:
+                sides = (0, 1)
+            elif p1_count * 2 > pieces:
+                sides = (1,)
+            else:
+                sides = (0,)
+            for p1_cells in combinations(occupied_cells, p1_count):
+                p1_bits, p1_rank = 0, 0
+                for cell in p1_cells:
+                    p1_bits |= 1 << cell
+                    p1_rank += powers[cell]
+                rank = 2 * occupied_rank - p1_rank
+                tippies = (has_tippy(p1_bits, n),
+                           has_tippy(occupied ^ p1_bits, n))
+                for side in sides:
+                    if tippies[1 - side]:
+                        # The player who just moved has won.
+                        entry = LOSE << 6
+                    elif tippies[side]:
+                        # The game would have ended a move earlier.
+                        entry = UNKNOWN
+                    elif not free:
+                        entry = DRAW << 6
+                    else:
+                        entry = solve_position(table, 2 * rank + side, side,
+                                               free, powers)
+                    table[HEADER.size + 2 * rank + side] = entry
+
+
+def solve_position(table, index, side, free, powers):
+    """ (mmap, int, int, list of int, list of int) -> int
+
+    Return the tablebase entry of the position at index, with side to move
+    and the given free cells, from the entries of the positions its moves
+    reach.
+    """
+
+    # A move adds 1 or 2 times the cell's power of 3 to the rank, and
+    # passes the move to the other side.
+    step = 2 * (side + 1)
+    other = 1 - 2 * side
+    best, best_cell = LOSE, free[0]
+    for cell in free:
+        value = table[HEADER.size + index + step * powers[cell] + other] >> 6
+        if value == LOSE:
+            return WIN << 6 | cell
+        if value == DRAW and best == LOSE:
+            best, best_cell = DRAW, cell
+    return best << 6 | best_cell
+
+
+def open_tablebase(path):
+    """ (str) -> tuple of (int, mmap)
+
+    Return the sidelength of the boards of the complete tablebase at path,
+    and the file mapped read-only. Raise ValueError if it is incomplete.
+    """
+
+    n, solved = read_header(path)
+    if solved != 0:
+        raise ValueError('{} is not completely built'.format(path))
+    with open(path, 'rb') as f:
+        return n, mmap(f.fileno(), 0, access=ACCESS_READ)
+
+
+def probe(table, state):
+    """ (mmap, TippyGameState) -> tuple of (int, int)
+
+    Return the value of state for its next player (UNKNOWN, WIN, LOSE or
+    DRAW) and the cell of its best move, as stored in table.
+    """
+
+    entry = table[HEADER.size + tablebase_index(state.p1_bits, state.p2_bits,
+                                                state.n, state.next_player)]
+    return entry >> 6, entry & 63
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) == 3:
+        # python tippy_tablebase.py n path
+        build_tablebase(sys.argv[2], int(sys.argv[1]))
+    else:
+        import doctest
+        doctest.testmod()
@@ -0,0 +1,149 @@
+from collections import OrderedDict
+from sys import getsizeof
+
+# Approximate bytes an OrderedDict spends per entry on top of its key and
+# value: hash table slot and linked-list node.
+ENTRY_OVERHEAD = 100
+
+# Kinds of score stored by alpha-beta search: the exact score, a lower
+# bound (the search was cut off above beta) or an upper bound (no move
+# reached alpha).
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable:
+    ''' A bounded dictionary of search results, meant to outlive a single
+    search. When a bound is exceeded, the least recently used entries are
+    evicted.
+
+    max_entries: int  -- most entries kept, or None for no bound
+    max_bytes: int    -- most bytes (approximately) used by keys and values,
+                         or None for no bound
+    size: int         -- approximate bytes used by keys and values
+    hits: int         -- number of calls to get that found their key
+    misses: int       -- number of calls to get that did not
+    stores: int       -- number of entries stored
+    evictions: int    -- number of entries evicted to respect the bounds
+    '''
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        '''(TranspositionTable, int, int) -> NoneType
+
+        Create an empty TranspositionTable with the given bounds.
+        '''
+        self.max_entries, self.max_bytes = max_entries, max_bytes
+        self.size = 0
+        self.hits, self.misses, self.stores, self.evictions = 0, 0, 0, 0
+        self._entries = OrderedDict()
+
+    def __repr__(self):
+        '''(TranspositionTable) -> str
+
+        Return a string representation of this TranspositionTable.
+
+        >>> TranspositionTable(10)
+        TranspositionTable(10, None)
+        '''
+        return 'TranspositionTable({}, {})'.format(repr(self.max_entries),
+                                                   repr(self.max_bytes))
+
+    def __len__(self):
+        '''(TranspositionTable) -> int
+
+        Return the number of entries in this TranspositionTable.
+        '''
+        return len(self._entries)
+
+    def __contains__(self, key):
+        '''(TranspositionTable, object) -> bool
+
+        Return whether key has an entry. Does not count as a use of it.
+        '''
+        return key in self._entries
+
+    def __getitem__(self, key):
+        '''(TranspositionTable, object) -> object
+
+        Return the entry for key, marking it as recently used. Raise
+        KeyError if there is none.
+        '''
+        value = self._entries[key]
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        '''(TranspositionTable, object, object) -> object
+
+        Return the entry for key, marking it as recently used, or default if
+        there is none. Counts a hit or a miss.
+
+        >>> table = TranspositionTable()
+        >>> table[(17, 'p1')] = (1, None)
+        >>> table.get((17, 'p1')), table.get((16, 'p1'))
+        ((1, None), None)
+        >>> table.hits, table.misses
+        (1, 1)
+        '''
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        '''(TranspositionTable, object, object) -> NoneType
+
+        Store value as the entry for key, then evict the least recently used
+        entries until the bounds are respected.
+
+        >>> table = TranspositionTable(max_entries=2)
+        >>> for total in range(4):
+        ...     table[total] = (1, None)
+        >>> sorted(table._entries), table.evictions
+        ([2, 3], 2)
+        '''
+        if key in self._entries:
+            self.size -= entry_size(key, self._entries.pop(key))
+        self._entries[key] = value
+        self.size += entry_size(key, value)
+        self.stores += 1
+        while ((self.max_entries is not None and
+                len(self._entries) > self.max_entries) or
+               (self.max_bytes is not None and self.size > self.max_bytes)):
+            old_key, old_value = self._entries.popitem(last=False)
+            self.size -= entry_size(old_key, old_value)
+            self.evictions += 1
+
+    def clear(self):
+        '''(TranspositionTable) -> NoneType
+
+        Remove every entry from this TranspositionTable. The counters are
+        kept.
+        '''
+        self._entries.clear()
+        self.size = 0
+
+
+def entry_size(key, value):
+    '''(object, object) -> int
+
+    Return the approximate number of bytes an entry for key and value uses
+    in a TranspositionTable: the objects themselves, the items of a tuple
+    key or value, and the table's own overhead.
+
+    >>> entry_size(3, (1, None)) > 0
+    True
+    '''
+    size = ENTRY_OVERHEAD + getsizeof(key) + getsizeof(value)
+    for part in (key, value):
+        if isinstance(part, tuple):
+            for item in part:
+                size += getsizeof(item)
+    return size
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -3,21 +3,17 @@
 
 class Tree:
     ''' Represent a Bare-bones Tree ADT'''
+    __slots__ = ('value', 'children')
 
     def __init__(self, value=None, children=None):
         """ (Tree, object, list-of-Tree) -> NoneType
 
         Create Tree(self) with root containing value and
-        0 or more children Trees.
+        0 or more children Trees. The list children becomes the
+        children of self, without being copied.
         """
         self.value = value
-        # copy children if not None
-        self.children = children.copy() if children else []
-        # the functional if  on the line above is equivalent to:
-       #if not children:
-           #self.children = []
-       #else:
-           #self.children = children.copy()
+        self.children = children if children is not None else []
 
     def __repr__(self):
         """ (Tree) -> str